@@ -4,16 +4,28 @@ Main bot implementation with chat, alert, and portal functionality
 Railway deployment ready
 """
 import asyncio
+import hmac
+import html
 import logging
 import os
+import queue
+import re
+import secrets
+import signal
 import sys
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+import httpx
 from aiohttp import web
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand, ChatMemberUpdated
 from telegram.ext import (
+    AIORateLimiter,
     Application,
+    ApplicationHandlerStop,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -21,23 +33,139 @@ from telegram.ext import (
     ChatMemberHandler,
     filters
 )
-from telegram.constants import ParseMode, ChatMemberStatus
+from telegram.request import HTTPXRequest
+from telegram.constants import ParseMode, ChatMemberStatus, ChatAction, ChatType
+from telegram.error import NetworkError, TelegramError
 
 from config import config
 from dexscreener_client import DexScreenerClient
 from mogra_client import MograClient
 from database import DatabaseManager
+import json_utils
+from cache import TTLCache
+from setup_state import SetupStateStore, SetupStateFilter
+from templates import (
+    WELCOME_TEMPLATE,
+    HELP_TEXT,
+    PORTAL_HELP,
+    TRENDING_HEADER,
+    NEW_TOKENS_HEADER,
+    GAINERS_HEADER,
+    LOSERS_HEADER,
+    PORTALS_HEADER,
+    TOP_TRENDING_HEADER,
+    NEW_PAIRS_HEADER
+)
 from alert_service import AlertService, TokenAlert
-from portal_service import PortalService, format_portal_setup_message, format_verification_success
+from portal_service import PortalService, format_portal_setup_message, format_verification_success, is_valid_portal_id
 
-# Setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    stream=sys.stdout
-)
+# Setup logging: loggers only enqueue records, a listener thread writes them to stdout
+_log_queue = queue.SimpleQueue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _stdout_handler)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener.start()
 logger = logging.getLogger(__name__)
 
+# Max alert sends in flight at once (stays under Telegram's 30 msg/s with the rate limiter)
+ALERT_SEND_CONCURRENCY = 25
+
+# Background workers verifying portal group joins, and how many joins may wait for them
+JOIN_WORKERS = 4
+JOIN_QUEUE_SIZE = 10_000
+
+# Telegram shows a chat action for ~5s, so long waits re-send it this often
+TYPING_REFRESH_SECONDS = 4
+
+# Seconds to wait before retrying a Bot API call that never reached Telegram
+SEND_TIMEOUT_RETRY_DELAY = 1.0
+
+# httpx errors (wrapped in NetworkError) raised before the request was sent
+_UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Portal wizard text input: a channel @username, or a group ID / t.me link
+_CHANNEL_RE = re.compile(r"^@(\w{5,32})$")
+_GROUP_RE = re.compile(r"^(?:(-\d+)|(?:https?://)?t\.me/\S+)$")
+
+# Update types the bot handles, for both polling and webhook delivery:
+#   message         commands, AI chat and portal wizard input
+#   callback_query  inline keyboard buttons
+#   chat_member     joins to portal groups (must be requested explicitly)
+#   my_chat_member  the bot's own admin status changes (invalidates _chat_cache)
+# edited_message, channel_post etc. are never handled, so Telegram shouldn't send them
+ALLOWED_UPDATES = ["message", "callback_query", "chat_member", "my_chat_member"]
+
+# getUpdates long-poll window; one request waits up to this long for updates
+POLL_TIMEOUT_SECONDS = 50
+
+# Static reply keyboard, built once at import
+START_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📊 Subscribe to Alerts", callback_data="subscribe"),
+        InlineKeyboardButton("🔍 Search Token", callback_data="search")
+    ],
+    [
+        InlineKeyboardButton("📈 Trending", callback_data="trending"),
+        InlineKeyboardButton("🆕 New Pairs", callback_data="new_pairs")
+    ]
+])
+
+# Command menu registered with Telegram once at startup
+BOT_COMMANDS = (
+    BotCommand("start", "Start the bot"),
+    BotCommand("help", "Show help"),
+    BotCommand("alerts", "Manage alert settings"),
+    BotCommand("subscribe", "Subscribe to alerts"),
+    BotCommand("unsubscribe", "Unsubscribe from alerts"),
+    BotCommand("trending", "View trending tokens"),
+    BotCommand("new", "View new tokens"),
+    BotCommand("gainers", "Top gaining tokens"),
+    BotCommand("losers", "Top losing tokens"),
+    BotCommand("search", "Search for a token"),
+    BotCommand("price", "Get token price"),
+    BotCommand("chat", "Start AI chat"),
+    BotCommand("setchat", "Set Mogra chat ID"),
+    BotCommand("portal", "Manage verification portals"),
+)
+
+
+@lru_cache(maxsize=4096)
+def _escape(text: Any) -> str:
+    """HTML-escape a user or DEX supplied value (symbols repeat across replies)"""
+    return html.escape(str(text))
+
+
+def _split_message(text: str, limit: int = 4000) -> List[str]:
+    """Split text into chunks of at most `limit` chars, preferring paragraph, line, then word breaks"""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = window.rfind("\n\n")
+        if cut <= 0:
+            cut = window.rfind("\n")
+        if cut <= 0:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _fmt_age(age: Optional[float], unknown: str = "N/A") -> str:
+    """Format a pair age in minutes as '42m' or '3.5h'"""
+    if not age:
+        return unknown
+    return f"{int(age)}m" if age < 60 else f"{age/60:.1f}h"
+
+
+def _liquidity_key(pair) -> float:
+    """Sort key for picking the deepest pool; missing liquidity ranks lowest"""
+    return pair.liquidity_usd if pair.liquidity_usd is not None else 0.0
+
 
 class MegaETHBot:
     """Main Telegram bot class"""
@@ -50,7 +178,40 @@ class MegaETHBot:
         self.portal_service: Optional[PortalService] = None
         self.application: Optional[Application] = None
         self._health_server: Optional[web.AppRunner] = None
-        self._setup_state: Dict[int, Dict] = {}  # Track portal setup wizard state
+        self._health_body = b""
+        # Only Telegram knows this, so requests without it are not real updates
+        self._webhook_secret = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        self._setup_state = SetupStateStore(config.REDIS_URL)  # Portal setup wizard state; abandoned wizards expire
+        self._mogra_cache = TTLCache(maxsize=10_000, ttl=300)  # telegram_id -> mogra_chat_id
+        self._market_cache = TTLCache(maxsize=256, ttl=30)  # Shared market list / token lookup results
+        self._chat_cache = TTLCache(maxsize=1024, ttl=60)  # get_chat / get_chat_member results for the setup wizard
+        self._inflight: Dict[str, asyncio.Future] = {}  # In-flight upstream fetches by key
+        self._join_queue: asyncio.Queue = asyncio.Queue(maxsize=JOIN_QUEUE_SIZE)
+        self._join_workers: List[asyncio.Task] = []
+        self._stop_event = asyncio.Event()
+        self._portal_subcmds = {
+            "setup": self._portal_setup_start,
+            "list": self._portal_list,
+            "post": self._portal_post,
+            "stats": self._portal_stats,
+            "settings": self._portal_settings,
+            "delete": self._portal_delete,
+        }
+        self._callback_handlers = {
+            "portal_verify": self._cb_portal_verify,
+            "portal_setup_confirm": self._cb_portal_setup_confirm,
+            "portal_setup_cancel": self._cb_portal_setup_cancel,
+            "portal_toggle": self._cb_portal_toggle,
+            "portal_req_username": self._cb_portal_req_username,
+            "portal_req_photo": self._cb_portal_req_photo,
+            "portal_confirm_delete": self._cb_portal_confirm_delete,
+            "portal_cancel_delete": self._cb_portal_cancel_delete,
+            "subscribe": self._cb_subscribe,
+            "subscribe_here": self._cb_subscribe_here,
+            "toggle_alerts": self._cb_toggle_alerts,
+            "trending": self._cb_trending,
+            "new_pairs": self._cb_new_pairs,
+        }
     
     async def initialize(self):
         """Initialize all services"""
@@ -61,24 +222,40 @@ class MegaETHBot:
             self._send_alert_callback
         )
         # Portal service will be initialized after application is created
+        self._join_workers = [asyncio.create_task(self._join_worker()) for _ in range(JOIN_WORKERS)]
         logger.info("Bot initialized")
     
     async def shutdown(self):
         """Shutdown all services"""
+        for worker in self._join_workers:
+            worker.cancel()
+        await asyncio.gather(*self._join_workers, return_exceptions=True)
         if self.alert_service:
             await self.alert_service.stop()
         await self.dex_client.close()
         await self.mogra_client.close()
         await self.db.close()
+        await self._setup_state.close()
         if self._health_server:
             await self._health_server.cleanup()
         logger.info("Bot shutdown complete")
+        _log_listener.stop()
     
     async def _start_health_server(self):
         """Start health check server for Railway"""
+        # The payload never changes while running, so serialize it once
+        self._health_body = json_utils.dumps({
+            "status": "ok",
+            "service": "megaeth-telegram-bot",
+            "environment": config.RAILWAY_ENVIRONMENT
+        }).encode()
+        
         app = web.Application()
         app.router.add_get('/', self._health_check)
         app.router.add_get('/health', self._health_check)
+        if config.RAILWAY_PUBLIC_DOMAIN:
+            # Telegram posts updates to the same server, so PORT is bound only once
+            app.router.add_post(f"/{config.TELEGRAM_BOT_TOKEN}", self._telegram_webhook)
         
         runner = web.AppRunner(app)
         await runner.setup()
@@ -92,11 +269,24 @@ class MegaETHBot:
     
     async def _health_check(self, request):
         """Health check endpoint"""
-        return web.json_response({
-            "status": "ok",
-            "service": "megaeth-telegram-bot",
-            "environment": config.RAILWAY_ENVIRONMENT
-        })
+        return web.Response(body=self._health_body, content_type="application/json")
+    
+    async def _telegram_webhook(self, request):
+        """Webhook endpoint: queue a pushed update for the application"""
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(secret, self._webhook_secret):
+            return web.Response(status=403)
+        if not self.application:
+            return web.Response(status=503)  # Telegram retries until we're up
+        try:
+            data = await request.json(loads=json_utils.loads)
+            if not isinstance(data, dict):
+                return web.Response(status=400)
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, KeyError, TypeError):
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        return web.Response()
     
     async def _send_alert_callback(self, alert: TokenAlert, subscriptions: List[Dict[str, Any]]):
         """Callback to send alerts to subscribed chats"""
@@ -104,136 +294,149 @@ class MegaETHBot:
             return
         
         message = alert.format_telegram_message()
+        pair_address = alert.pair.pair_address
+        alert_type = alert.alert_type
         
-        for sub in subscriptions:
-            chat_id = sub["chat_id"]
+        # Identical for every subscriber, so build the send kwargs once
+        send_kwargs = dict(text=message, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=False)
+        semaphore = asyncio.Semaphore(ALERT_SEND_CONCURRENCY)
+        
+        tasks = [self._send_one(sub["chat_id"], send_kwargs, semaphore) for sub in subscriptions]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Log every successful send in one batched write
+        rows = [
+            (sub["telegram_id"], sub["chat_id"], pair_address, alert_type, message)
+            for sub, sent in zip(subscriptions, results)
+            if sent is True
+        ]
+        await self.db.log_alerts_bulk(rows)
+    
+    async def _send_one(self, chat_id: int, send_kwargs: Dict[str, Any], semaphore: asyncio.Semaphore) -> bool:
+        """Send one alert to one subscribed chat"""
+        async with semaphore:
             try:
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode=ParseMode.MARKDOWN,
-                    disable_web_page_preview=False
-                )
-                await self.db.log_alert(
-                    telegram_id=sub["telegram_id"],
-                    chat_id=chat_id,
-                    pair_address=alert.pair.pair_address,
-                    alert_type=alert.alert_type,
-                    message=message
+                await self._send_with_retry(
+                    lambda: self.application.bot.send_message(chat_id=chat_id, **send_kwargs)
                 )
+                return True
             except Exception as e:
                 logger.error(f"Failed to send alert to chat {chat_id}: {e}")
+                return False
+    
+    async def _send_with_retry(self, send_coro_factory: Callable[[], Awaitable[Any]], retries: int = 2) -> Any:
+        """Run a Bot API call, retrying only failures where the request never left
+        
+        Flood waits (RetryAfter) are handled by the AIORateLimiter. Read timeouts
+        aren't retried: Telegram may already have delivered the message, and a
+        retry would send it twice.
+        """
+        for attempt in range(retries + 1):
+            try:
+                return await send_coro_factory()
+            except NetworkError as e:
+                if attempt == retries or not isinstance(e.__cause__, _UNSENT_REQUEST_ERRORS):
+                    raise
+                await asyncio.sleep(SEND_TIMEOUT_RETRY_DELAY)
+    
+    async def _single_flight(self, key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one upstream fetch per key, letting concurrent callers await the same result"""
+        existing = self._inflight.get(key)
+        if existing:
+            # Shield so a cancelled waiter doesn't cancel the shared fetch
+            return await asyncio.shield(existing)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await coro_factory()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when no one else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _keep_typing(self, chat):
+        """Show the typing indicator until cancelled"""
+        try:
+            while True:
+                await chat.send_action(ChatAction.TYPING)
+                await asyncio.sleep(TYPING_REFRESH_SECONDS)
+        except TelegramError as e:
+            logger.debug(f"Typing indicator stopped: {e}")
+    
+    @asynccontextmanager
+    async def _typing(self, chat):
+        """Keep the typing indicator up while the body runs, without delaying it"""
+        task = asyncio.create_task(self._keep_typing(chat))
+        try:
+            yield
+        finally:
+            task.cancel()
+    
+    async def _get_chat(self, bot, chat_id):
+        """get_chat, cached briefly so wizard retries don't refetch"""
+        key = ("chat", chat_id)
+        chat = self._chat_cache.get(key)
+        if chat is None:
+            chat = await bot.get_chat(chat_id)
+            self._chat_cache[key] = chat
+        return chat
+    
+    async def _get_chat_member(self, bot, chat_id, user_id: int):
+        """get_chat_member, cached briefly; member updates invalidate the entry"""
+        key = ("member", chat_id, user_id)
+        member = self._chat_cache.get(key)
+        if member is None:
+            member = await bot.get_chat_member(chat_id, user_id)
+            self._chat_cache[key] = member
+        return member
+    
+    async def _cached(self, key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a short-lived shared result, coalescing concurrent fetches of the same key"""
+        if key in self._market_cache:
+            return self._market_cache[key]
+        
+        result = await self._single_flight(key, coro_factory)
+        if result:
+            self._market_cache[key] = result
+        return result
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         user = update.effective_user
         await self.db.create_or_update_user(telegram_id=user.id, username=user.username)
         
-        welcome_message = f"""
-🚀 *Welcome to MegaETH Token Bot!* 🚀
-
-Hello {user.first_name}! I can help you with:
-
-📊 *Token Alerts*
-• New token launches on MegaETH
-• Price pumps and dumps
-• Volume spikes
-
-💬 *AI Chat*
-• Chat with AI via Mogra
-• Ask questions about crypto
-
-🔍 *Token Info*
-• Search for any token
-• View price, volume, liquidity
-• Track trending pairs
-
-*Quick Commands:*
-/alerts - Manage alert subscriptions
-/trending - View trending tokens
-/new - View newly launched tokens
-/gainers - Top gaining tokens
-/losers - Top losing tokens
-/search <query> - Search for a token
-/price <token> - Get token price
-/chat - Start AI chat
-/help - Show all commands
-
-Get started by typing /alerts to subscribe!
-        """
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("📊 Subscribe to Alerts", callback_data="subscribe"),
-                InlineKeyboardButton("🔍 Search Token", callback_data="search")
-            ],
-            [
-                InlineKeyboardButton("📈 Trending", callback_data="trending"),
-                InlineKeyboardButton("🆕 New Pairs", callback_data="new_pairs")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         await update.message.reply_text(
-            welcome_message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup
+            WELCOME_TEMPLATE.format(first_name=_escape(user.first_name)),
+            parse_mode=ParseMode.HTML,
+            reply_markup=START_KEYBOARD
         )
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
-        help_text = """
-📖 *MegaETH Bot Commands*
-
-*Alert Commands:*
-/alerts - Manage your alert subscriptions
-/subscribe - Subscribe to token alerts
-/unsubscribe - Unsubscribe from alerts
-
-*Token Info Commands:*
-/trending - Top tokens by volume
-/new - Newly launched tokens (24h)
-/gainers - Top gaining tokens
-/losers - Top losing tokens
-/search <query> - Search for a token
-/price <symbol> - Get token price
-
-*AI Chat Commands:*
-/chat - Start AI conversation
-/setchat <chat\\_id> - Set Mogra chat ID
-
-*🔐 Portal Commands:*
-/portal setup - Create new verification portal
-/portal list - List your portals
-/portal post <id> - Get portal message to post
-/portal stats <id> - View portal statistics
-/portal settings <id> - Configure portal
-/portal delete <id> - Delete a portal
-
-*Other Commands:*
-/help - Show this help message
-        """
-        
-        await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(HELP_TEXT, parse_mode=ParseMode.HTML)
     
     async def alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /alerts command"""
         user = update.effective_user
-        user_data = await self.db.get_user(user.id)
-        
-        if not user_data:
-            await self.db.create_or_update_user(user.id, user.username)
-            user_data = await self.db.get_user(user.id)
+        user_data = await self.db.upsert_and_fetch_user(user.id, user.username) or {}
         
         status = "✅ Enabled" if user_data.get("alerts_enabled") else "❌ Disabled"
         
         message = f"""
-🔔 *Alert Settings*
+🔔 <b>Alert Settings</b>
 
-*Status:* {status}
-*Min Volume:* ${user_data.get('min_volume_usd', 1000):.0f}
-*Min Liquidity:* ${user_data.get('min_liquidity_usd', 500):.0f}
-*Price Change Threshold:* {user_data.get('price_change_threshold', 10)}%
+<b>Status:</b> {status}
+<b>Min Volume:</b> ${user_data.get('min_volume_usd', 1000):.0f}
+<b>Min Liquidity:</b> ${user_data.get('min_liquidity_usd', 500):.0f}
+<b>Price Change Threshold:</b> {user_data.get('price_change_threshold', 10)}%
 
 Select an option below:
         """
@@ -251,7 +454,7 @@ Select an option below:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
     
     async def subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /subscribe command"""
@@ -263,8 +466,8 @@ Select an option below:
         
         if success:
             await update.message.reply_text(
-                "✅ *Subscribed!*\n\nYou will now receive MegaETH token alerts in this chat.",
-                parse_mode=ParseMode.MARKDOWN
+                "✅ <b>Subscribed!</b>\n\nYou will now receive MegaETH token alerts in this chat.",
+                parse_mode=ParseMode.HTML
             )
         else:
             await update.message.reply_text("❌ Failed to subscribe. Please try again.")
@@ -278,90 +481,91 @@ Select an option below:
         
         if success:
             await update.message.reply_text(
-                "✅ *Unsubscribed!*\n\nYou will no longer receive alerts in this chat.",
-                parse_mode=ParseMode.MARKDOWN
+                "✅ <b>Unsubscribed!</b>\n\nYou will no longer receive alerts in this chat.",
+                parse_mode=ParseMode.HTML
             )
         else:
             await update.message.reply_text("❌ Failed to unsubscribe.")
     
     async def trending_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /trending command"""
-        await update.message.reply_text("🔄 Fetching trending tokens...")
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
         
-        pairs = await self.alert_service.get_trending_pairs(10)
+        pairs = await self._cached("trending:10", lambda: self.alert_service.get_trending_pairs(10))
         
         if not pairs:
             await update.message.reply_text("❌ No trending tokens found.")
             return
         
-        message = "📈 *Trending MegaETH Tokens*\n\n"
+        parts = [TRENDING_HEADER]
         
         for i, pair in enumerate(pairs, 1):
             change = f"{pair.price_change_24h:+.1f}%" if pair.price_change_24h else "N/A"
             change_emoji = "🟢" if (pair.price_change_24h or 0) >= 0 else "🔴"
             
-            message += f"{i}. *{pair.base_token_symbol}*\n"
-            message += f"   💵 {pair.format_price()} {change_emoji} {change}\n"
-            message += f"   📊 Vol: {pair.format_volume()} | Liq: {pair.format_liquidity()}\n\n"
+            parts.append(f"{i}. <b>{_escape(pair.base_token_symbol)}</b>\n")
+            parts.append(f"   💵 {pair.format_price()} {change_emoji} {change}\n")
+            parts.append(f"   📊 Vol: {pair.format_volume()} | Liq: {pair.format_liquidity()}\n\n")
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def new_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /new command"""
-        await update.message.reply_text("🔄 Fetching new token launches...")
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
         
-        pairs = await self.alert_service.get_new_pairs(24)
+        pairs = await self._cached("new:24", lambda: self.alert_service.get_new_pairs(24))
         
         if not pairs:
             await update.message.reply_text("❌ No new tokens found in the last 24 hours.")
             return
         
-        message = "🆕 *New MegaETH Tokens (24h)*\n\n"
+        parts = [NEW_TOKENS_HEADER]
         
         for pair in pairs[:10]:
-            age = pair.get_age_minutes()
-            age_str = f"{int(age)}m" if age and age < 60 else f"{age/60:.1f}h" if age else "N/A"
-            
-            message += f"• *{pair.base_token_symbol}* ({age_str} ago)\n"
-            message += f"  💵 {pair.format_price()} | 💧 {pair.format_liquidity()}\n\n"
+            parts.append(f"• <b>{_escape(pair.base_token_symbol)}</b> ({_fmt_age(pair.get_age_minutes())} ago)\n")
+            parts.append(f"  💵 {pair.format_price()} | 💧 {pair.format_liquidity()}\n\n")
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def gainers_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /gainers command"""
-        await update.message.reply_text("🔄 Fetching top gainers...")
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
         
-        pairs = await self.alert_service.get_gainers(10)
+        pairs = await self._cached("gainers:10", lambda: self.alert_service.get_gainers(10))
         
         if not pairs:
             await update.message.reply_text("❌ No gainers found.")
             return
         
-        message = "🚀 *Top MegaETH Gainers (24h)*\n\n"
+        parts = [GAINERS_HEADER]
         
         for i, pair in enumerate(pairs, 1):
-            message += f"{i}. *{pair.base_token_symbol}* 🟢 +{pair.price_change_24h:.1f}%\n"
-            message += f"   💵 {pair.format_price()} | 📊 {pair.format_volume()}\n\n"
+            parts.append(f"{i}. <b>{_escape(pair.base_token_symbol)}</b> 🟢 +{pair.price_change_24h:.1f}%\n")
+            parts.append(f"   💵 {pair.format_price()} | 📊 {pair.format_volume()}\n\n")
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def losers_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /losers command"""
-        await update.message.reply_text("🔄 Fetching top losers...")
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
         
-        pairs = await self.alert_service.get_losers(10)
+        pairs = await self._cached("losers:10", lambda: self.alert_service.get_losers(10))
         
         if not pairs:
             await update.message.reply_text("❌ No losers found.")
             return
         
-        message = "📉 *Top MegaETH Losers (24h)*\n\n"
+        parts = [LOSERS_HEADER]
         
         for i, pair in enumerate(pairs, 1):
-            message += f"{i}. *{pair.base_token_symbol}* 🔴 {pair.price_change_24h:.1f}%\n"
-            message += f"   💵 {pair.format_price()} | 📊 {pair.format_volume()}\n\n"
+            parts.append(f"{i}. <b>{_escape(pair.base_token_symbol)}</b> 🔴 {pair.price_change_24h:.1f}%\n")
+            parts.append(f"   💵 {pair.format_price()} | 📊 {pair.format_volume()}\n\n")
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def search_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /search command"""
@@ -372,23 +576,24 @@ Select an option below:
         query = " ".join(context.args)
         await update.message.reply_text(f"🔍 Searching for '{query}'...")
         
-        pairs = await self.alert_service.get_token_info(query)
+        pairs = await self._cached(f"token:{query.upper()}", lambda: self.alert_service.get_token_info(query))
         
         if not pairs:
             await update.message.reply_text(f"❌ No tokens found for '{query}'")
             return
         
-        message = f"🔍 *Search Results for '{query}'*\n\n"
+        parts = [f"🔍 <b>Search Results for '{_escape(query)}'</b>\n\n"]
         
         for pair in pairs[:5]:
             change_24h = f"{pair.price_change_24h:+.1f}%" if pair.price_change_24h else "N/A"
             
-            message += f"*{pair.base_token_name}* ({pair.base_token_symbol})\n"
-            message += f"💵 {pair.format_price()} | 📈 {change_24h}\n"
-            message += f"📊 Vol: {pair.format_volume()} | 💧 Liq: {pair.format_liquidity()}\n"
-            message += f"[View on DexScreener]({pair.url})\n\n"
+            parts.append(f"<b>{_escape(pair.base_token_name)}</b> ({_escape(pair.base_token_symbol)})\n")
+            parts.append(f"💵 {pair.format_price()} | 📈 {change_24h}\n")
+            parts.append(f"📊 Vol: {pair.format_volume()} | 💧 Liq: {pair.format_liquidity()}\n")
+            parts.append(f'<a href="{html.escape(pair.url)}">View on DexScreener</a>\n\n')
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
     
     async def price_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /price command"""
@@ -397,23 +602,23 @@ Select an option below:
             return
         
         symbol = context.args[0].upper()
-        pairs = await self.alert_service.get_token_info(symbol)
+        pairs = await self._cached(f"token:{symbol}", lambda: self.alert_service.get_token_info(symbol))
         
         if not pairs:
             await update.message.reply_text(f"❌ Token '{symbol}' not found")
             return
         
-        pair = max(pairs, key=lambda p: p.liquidity_usd or 0)
+        pair = max(pairs, key=_liquidity_key)
         
         message = f"""
-💰 *{pair.base_token_name}* ({pair.base_token_symbol})
+💰 <b>{_escape(pair.base_token_name)}</b> ({_escape(pair.base_token_symbol)})
 
-💵 *Price:* {pair.format_price()}
-📊 *24h Volume:* {pair.format_volume()}
-💧 *Liquidity:* {pair.format_liquidity()}
-📈 *Market Cap:* {pair.format_market_cap()}
+💵 <b>Price:</b> {pair.format_price()}
+📊 <b>24h Volume:</b> {pair.format_volume()}
+💧 <b>Liquidity:</b> {pair.format_liquidity()}
+📈 <b>Market Cap:</b> {pair.format_market_cap()}
 
-*Price Changes:*
+<b>Price Changes:</b>
 """
         
         if pair.price_change_5m is not None:
@@ -426,14 +631,14 @@ Select an option below:
             emoji = "🟢" if pair.price_change_24h >= 0 else "🔴"
             message += f"• 24h: {emoji} {pair.price_change_24h:+.2f}%\n"
         
-        message += f"\n[View on DexScreener]({pair.url})"
+        message += f'\n<a href="{html.escape(pair.url)}">View on DexScreener</a>'
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
     
     async def chat_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /chat command"""
         user = update.effective_user
-        user_data = await self.db.get_user(user.id)
+        user_data = await self.db.upsert_and_fetch_user(user.id, user.username)
         mogra_chat_id = user_data.get("mogra_chat_id") if user_data else None
         
         if not mogra_chat_id:
@@ -442,25 +647,25 @@ Select an option below:
                 await self.db.create_or_update_user(user.id, user.username, mogra_chat_id)
             else:
                 await update.message.reply_text(
-                    "⚠️ *Chat Setup Required*\n\n"
+                    "⚠️ <b>Chat Setup Required</b>\n\n"
                     "Please set your Mogra chat ID first:\n"
-                    "/setchat YOUR\\_MOGRA\\_CHAT\\_ID\n\n"
+                    "/setchat YOUR_MOGRA_CHAT_ID\n\n"
                     "You can find your chat ID in the Mogra app.",
-                    parse_mode=ParseMode.MARKDOWN
+                    parse_mode=ParseMode.HTML
                 )
                 return
         
         await update.message.reply_text(
-            "💬 *AI Chat Enabled*\n\n"
+            "💬 <b>AI Chat Enabled</b>\n\n"
             "You can now send messages and I'll respond using AI.\n"
             "Just type your message and I'll chat with you!",
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=ParseMode.HTML
         )
     
     async def setchat_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setchat command"""
         if not context.args:
-            await update.message.reply_text("Usage: /setchat <mogra\\_chat\\_id>")
+            await update.message.reply_text("Usage: /setchat <mogra_chat_id>")
             return
         
         chat_id = context.args[0]
@@ -474,10 +679,11 @@ Select an option below:
         
         await self.db.create_or_update_user(user.id, user.username, chat_id)
         self.mogra_client.set_user_chat_id(user.id, chat_id)
+        self._mogra_cache.pop(user.id)
         
         await update.message.reply_text(
-            f"✅ *Chat ID Set!*\n\nChat: {chat.title}\nYou can now chat with AI!",
-            parse_mode=ParseMode.MARKDOWN
+            f"✅ <b>Chat ID Set!</b>\n\nChat: {_escape(chat.title)}\nYou can now chat with AI!",
+            parse_mode=ParseMode.HTML
         )
     
     # ==================== PORTAL COMMANDS ====================
@@ -488,38 +694,14 @@ Select an option below:
         
         if not context.args:
             # Show portal help
-            await update.message.reply_text(
-                "🔐 *Portal Commands*\n\n"
-                "Portals allow you to verify users before they join your private group.\n\n"
-                "*Commands:*\n"
-                "• `/portal setup` - Create new portal\n"
-                "• `/portal list` - List your portals\n"
-                "• `/portal post <id>` - Get verification message\n"
-                "• `/portal stats <id>` - View statistics\n"
-                "• `/portal settings <id>` - Configure portal\n"
-                "• `/portal delete <id>` - Delete portal\n\n"
-                "*How it works:*\n"
-                "1. Create a portal linking public channel → private group\n"
-                "2. Post verification message in public channel\n"
-                "3. Users click verify → get one-time invite link",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await update.message.reply_text(PORTAL_HELP, parse_mode=ParseMode.HTML)
             return
         
         subcommand = context.args[0].lower()
+        handler = self._portal_subcmds.get(subcommand)
         
-        if subcommand == "setup":
-            await self._portal_setup_start(update, context)
-        elif subcommand == "list":
-            await self._portal_list(update, context)
-        elif subcommand == "post":
-            await self._portal_post(update, context)
-        elif subcommand == "stats":
-            await self._portal_stats(update, context)
-        elif subcommand == "settings":
-            await self._portal_settings(update, context)
-        elif subcommand == "delete":
-            await self._portal_delete(update, context)
+        if handler:
+            await handler(update, context)
         else:
             await update.message.reply_text("Unknown portal command. Use /portal for help.")
     
@@ -528,18 +710,18 @@ Select an option below:
         user = update.effective_user
         
         # Initialize setup state
-        self._setup_state[user.id] = {
+        await self._setup_state.put(user.id, {
             "step": "channel",
             "data": {}
-        }
+        })
         
         await update.message.reply_text(
-            "🔐 *Portal Setup Wizard*\n\n"
-            "*Step 1/3: Public Channel*\n\n"
-            "Please forward a message from your *public channel* "
+            "🔐 <b>Portal Setup Wizard</b>\n\n"
+            "<b>Step 1/3: Public Channel</b>\n\n"
+            "Please forward a message from your <b>public channel</b> "
             "or send the channel username (e.g., @yourchannel).\n\n"
             "Make sure the bot is an admin in the channel!",
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=ParseMode.HTML
         )
     
     async def _portal_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -550,27 +732,28 @@ Select an option below:
         if not portals:
             await update.message.reply_text(
                 "📭 You don't have any portals yet.\n\n"
-                "Use `/portal setup` to create one!",
-                parse_mode=ParseMode.MARKDOWN
+                "Use <code>/portal setup</code> to create one!",
+                parse_mode=ParseMode.HTML
             )
             return
         
-        message = "🔐 *Your Portals*\n\n"
+        parts = [PORTALS_HEADER]
         
         for portal in portals:
             status = "✅ Active" if portal.get("is_active") else "❌ Inactive"
-            message += f"*ID:* `{portal['portal_id']}`\n"
-            message += f"📢 @{portal.get('public_channel', 'N/A')}\n"
-            message += f"🔒 {portal.get('private_group', 'N/A')}\n"
-            message += f"👥 {portal.get('verified_count', 0)} verified\n"
-            message += f"Status: {status}\n\n"
-        
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+            parts.append(f"<b>ID:</b> <code>{portal['portal_id']}</code>\n")
+            parts.append(f"📢 @{portal.get('public_channel', 'N/A')}\n")
+            parts.append(f"🔒 {_escape(portal.get('private_group', 'N/A'))}\n")
+            parts.append(f"👥 {portal.get('verified_count', 0)} verified\n")
+            parts.append(f"Status: {status}\n\n")
+        
+        message = "".join(parts)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def _portal_post(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get portal post message"""
         if len(context.args) < 2:
-            await update.message.reply_text("Usage: `/portal post <portal_id>`", parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text("Usage: <code>/portal post &lt;portal_id&gt;</code>", parse_mode=ParseMode.HTML)
             return
         
         portal_id = context.args[1]
@@ -585,21 +768,21 @@ Select an option below:
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await update.message.reply_text(
-            "📝 *Copy this message to your public channel:*\n\n"
-            "_(Or forward the message below)_",
-            parse_mode=ParseMode.MARKDOWN
+            "📝 <b>Copy this message to your public channel:</b>\n\n"
+            "<i>(Or forward the message below)</i>",
+            parse_mode=ParseMode.HTML
         )
         
         await update.message.reply_text(
             result["text"],
-            parse_mode=ParseMode.MARKDOWN,
+            parse_mode=ParseMode.HTML,
             reply_markup=reply_markup
         )
     
     async def _portal_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show portal statistics"""
         if len(context.args) < 2:
-            await update.message.reply_text("Usage: `/portal stats <portal_id>`", parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text("Usage: <code>/portal stats &lt;portal_id&gt;</code>", parse_mode=ParseMode.HTML)
             return
         
         portal_id = context.args[1]
@@ -612,14 +795,14 @@ Select an option below:
         status = "✅ Active" if stats.get("is_active") else "❌ Inactive"
         
         message = f"""
-📊 *Portal Statistics*
+📊 <b>Portal Statistics</b>
 
-🆔 *ID:* `{stats['portal_id']}`
-📢 *Channel:* @{stats.get('public_channel', 'N/A')}
-🔒 *Group:* {stats.get('private_group', 'N/A')}
-📍 *Status:* {status}
+🆔 <b>ID:</b> <code>{stats['portal_id']}</code>
+📢 <b>Channel:</b> @{stats.get('public_channel', 'N/A')}
+🔒 <b>Group:</b> {_escape(stats.get('private_group', 'N/A'))}
+📍 <b>Status:</b> {status}
 
-*Users:*
+<b>Users:</b>
 ✅ Verified: {stats.get('verified_users', 0)}
 ⏳ Pending: {stats.get('pending_users', 0)}
 🚫 Banned: {stats.get('banned_users', 0)}
@@ -627,42 +810,42 @@ Select an option below:
 📅 Created: {stats.get('created_at', 'N/A')}
         """
         
-        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
     
     async def _portal_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show portal settings"""
         if len(context.args) < 2:
-            await update.message.reply_text("Usage: `/portal settings <portal_id>`", parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text("Usage: <code>/portal settings &lt;portal_id&gt;</code>", parse_mode=ParseMode.HTML)
             return
         
         portal_id = context.args[1]
-        portal = await self.db.get_portal(portal_id)
+        portal = await self.db.get_portal(portal_id) if is_valid_portal_id(portal_id) else None
         
         if not portal:
             await update.message.reply_text("❌ Portal not found")
             return
         
         # Check ownership
-        if portal.get("owner_id") != update.effective_user.id:
+        if portal.owner_id != update.effective_user.id:
             await update.message.reply_text("❌ You don't own this portal")
             return
         
         keyboard = [
             [
                 InlineKeyboardButton(
-                    f"{'🔕' if portal.get('is_active') else '🔔'} {'Disable' if portal.get('is_active') else 'Enable'}",
+                    f"{'🔕' if portal.is_active else '🔔'} {'Disable' if portal.is_active else 'Enable'}",
                     callback_data=f"portal_toggle:{portal_id}"
                 )
             ],
             [
                 InlineKeyboardButton(
-                    f"{'✅' if portal.get('require_username') else '❌'} Require Username",
+                    f"{'✅' if portal.require_username else '❌'} Require Username",
                     callback_data=f"portal_req_username:{portal_id}"
                 )
             ],
             [
                 InlineKeyboardButton(
-                    f"{'✅' if portal.get('require_profile_photo') else '❌'} Require Photo",
+                    f"{'✅' if portal.require_profile_photo else '❌'} Require Photo",
                     callback_data=f"portal_req_photo:{portal_id}"
                 )
             ],
@@ -673,30 +856,30 @@ Select an option below:
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await update.message.reply_text(
-            f"⚙️ *Portal Settings*\n\n"
-            f"*ID:* `{portal_id}`\n"
-            f"*Status:* {'✅ Active' if portal.get('is_active') else '❌ Inactive'}\n\n"
-            f"*Requirements:*\n"
-            f"• Username: {'Required' if portal.get('require_username') else 'Not required'}\n"
-            f"• Profile Photo: {'Required' if portal.get('require_profile_photo') else 'Not required'}\n",
-            parse_mode=ParseMode.MARKDOWN,
+            f"⚙️ <b>Portal Settings</b>\n\n"
+            f"<b>ID:</b> <code>{portal_id}</code>\n"
+            f"<b>Status:</b> {'✅ Active' if portal.is_active else '❌ Inactive'}\n\n"
+            f"<b>Requirements:</b>\n"
+            f"• Username: {'Required' if portal.require_username else 'Not required'}\n"
+            f"• Profile Photo: {'Required' if portal.require_profile_photo else 'Not required'}\n",
+            parse_mode=ParseMode.HTML,
             reply_markup=reply_markup
         )
     
     async def _portal_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Delete a portal"""
         if len(context.args) < 2:
-            await update.message.reply_text("Usage: `/portal delete <portal_id>`", parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text("Usage: <code>/portal delete &lt;portal_id&gt;</code>", parse_mode=ParseMode.HTML)
             return
         
         portal_id = context.args[1]
-        portal = await self.db.get_portal(portal_id)
+        portal = await self.db.get_portal(portal_id) if is_valid_portal_id(portal_id) else None
         
         if not portal:
             await update.message.reply_text("❌ Portal not found")
             return
         
-        if portal.get("owner_id") != update.effective_user.id:
+        if portal.owner_id != update.effective_user.id:
             await update.message.reply_text("❌ You don't own this portal")
             return
         
@@ -709,62 +892,98 @@ Select an option below:
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await update.message.reply_text(
-            f"⚠️ *Are you sure you want to delete this portal?*\n\n"
-            f"Portal ID: `{portal_id}`\n"
+            f"⚠️ <b>Are you sure you want to delete this portal?</b>\n\n"
+            f"Portal ID: <code>{portal_id}</code>\n"
             f"This action cannot be undone!",
-            parse_mode=ParseMode.MARKDOWN,
+            parse_mode=ParseMode.HTML,
             reply_markup=reply_markup
         )
     
     async def handle_chat_member(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle new members joining through portal"""
+        """Queue new members joining a portal group for background verification"""
         result = update.chat_member
+        self._chat_cache.pop(("member", result.chat.id, result.new_chat_member.user.id))
         
         if result.new_chat_member.status not in [ChatMemberStatus.MEMBER, ChatMemberStatus.RESTRICTED]:
             return
         
+        try:
+            self._join_queue.put_nowait((result.chat.id, result.new_chat_member.user.id, result.chat.title))
+        except asyncio.QueueFull:
+            logger.warning(f"Join queue full, dropping join of user {result.new_chat_member.user.id}")
+    
+    async def handle_my_chat_member(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Forget cached bot membership when the bot's own status in a chat changes"""
+        result = update.my_chat_member
+        self._chat_cache.pop(("member", result.chat.id, result.new_chat_member.user.id))
+    
+    async def _join_worker(self):
+        """Process queued group joins"""
+        while True:
+            chat_id, user_id, chat_title = await self._join_queue.get()
+            try:
+                await self._process_join(chat_id, user_id, chat_title)
+            except Exception as e:
+                logger.error(f"Error processing join of user {user_id} in {chat_id}: {e}")
+            finally:
+                self._join_queue.task_done()
+    
+    async def _process_join(self, chat_id: int, user_id: int, chat_title: str):
+        """Kick members who joined a portal group without verifying"""
         # Check if this group has a portal
-        portal = await self.db.get_portal_by_private_group(result.chat.id)
+        portal = await self.db.get_portal_by_private_group(chat_id)
         if not portal:
             return
         
-        user_id = result.new_chat_member.user.id
-        portal_id = portal["portal_id"]
+        portal_id = portal.portal_id
         
         # Check if user was verified
         verified = await self.portal_service.handle_new_member(portal_id, user_id)
         
         if not verified:
             # User joined without verification - kick them
-            logger.info(f"Kicking unverified user {user_id} from group {result.chat.id}")
-            await self.portal_service.kick_unverified_user(result.chat.id, user_id)
+            logger.info(f"Kicking unverified user {user_id} from group {chat_id}")
+            await self.portal_service.kick_unverified_user(chat_id, user_id)
             
             # Try to send them a message
             try:
-                await context.bot.send_message(
+                await self._send_with_retry(lambda: self.application.bot.send_message(
                     user_id,
-                    f"⚠️ You tried to join *{result.chat.title}* without verification.\n\n"
+                    f"⚠️ You tried to join <b>{_escape(chat_title)}</b> without verification.\n\n"
                     f"Please verify through the official channel first!",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-    
+                    parse_mode=ParseMode.HTML
+                ))
             except Exception:
-                pass
+                pass  # Users who never started the bot can't be messaged
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle regular messages - AI chat and portal setup"""
         user = update.effective_user
         message = update.message
         
-        # Check if user is in portal setup wizard
-        if user.id in self._setup_state:
-            await self._handle_portal_setup_message(update, context)
+        if not message or not user:
+            return
+        
+        # Wizard messages are routed by handle_setup_message; Redis-backed wizards
+        # can predate this process's index (restart). The wizard runs in private
+        # chat, and the store looks each user up at most once
+        if message.chat.type == ChatType.PRIVATE:
+            state = await self._setup_state.recover(user.id)
+            if state:
+                await self._handle_portal_setup_message(update, context, state)
+                return
+        
+        # Nothing to chat about (media, or a command that slipped through) - skip the DB entirely
+        if not message.text or message.text.startswith("/"):
             return
         
         message_text = message.text
         
-        user_data = await self.db.get_user(user.id)
-        mogra_chat_id = user_data.get("mogra_chat_id") if user_data else None
+        mogra_chat_id = self._mogra_cache.get(user.id)
+        
+        if not mogra_chat_id:
+            user_data = await self.db.get_user(user.id)
+            mogra_chat_id = user_data.get("mogra_chat_id") if user_data else None
         
         if not mogra_chat_id:
             mogra_chat_id = self.mogra_client.get_user_chat_id(user.id)
@@ -774,36 +993,40 @@ Select an option below:
             if mogra_chat_id:
                 await self.db.create_or_update_user(user.id, user.username, mogra_chat_id)
         
+        if mogra_chat_id:
+            self._mogra_cache[user.id] = mogra_chat_id
+        
         if not mogra_chat_id:
             await update.message.reply_text(
                 "💬 To chat with AI, please set up your Mogra chat first:\n"
-                "/setchat YOUR\\_MOGRA\\_CHAT\\_ID",
-                parse_mode=ParseMode.MARKDOWN
+                "/setchat YOUR_MOGRA_CHAT_ID",
+                parse_mode=ParseMode.HTML
             )
             return
         
-        await update.message.chat.send_action("typing")
-        
-        response = await self.mogra_client.send_and_wait(mogra_chat_id, message_text, timeout=60)
+        async with self._typing(update.message.chat):
+            response = await self.mogra_client.send_and_wait(mogra_chat_id, message_text, timeout=60)
         
         if response:
-            if len(response) > 4000:
-                for i in range(0, len(response), 4000):
-                    await update.message.reply_text(response[i:i+4000])
-            else:
-                await update.message.reply_text(response)
+            # Sent one after another: concurrent sends can arrive out of order
+            for chunk in _split_message(response):
+                await update.message.reply_text(chunk)
         else:
             await update.message.reply_text("⚠️ Sorry, I couldn't get a response. Please try again.")
     
-    async def _handle_portal_setup_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def handle_setup_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle messages from users in the portal setup wizard, ahead of chat"""
+        state = await self._setup_state.get(update.effective_user.id)
+        if not state:
+            return  # Expired meanwhile; let the regular handlers see it
+        await self._handle_portal_setup_message(update, context, state)
+        raise ApplicationHandlerStop
+    
+    async def _handle_portal_setup_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                           state: Dict[str, Any]):
         """Handle messages during portal setup wizard"""
         user = update.effective_user
         message = update.message
-        state = self._setup_state.get(user.id)
-        
-        if not state:
-            return
-        
         step = state.get("step")
         
         if step == "channel":
@@ -811,50 +1034,50 @@ Select an option below:
             channel_id = None
             channel_username = None
             
-            if message.forward_from_chat:
-                # Forwarded from channel
-                channel_id = message.forward_from_chat.id
-                channel_username = message.forward_from_chat.username
-            elif message.text and message.text.startswith("@"):
-                # Username provided
-                channel_username = message.text[1:]  # Remove @
-                try:
-                    chat = await context.bot.get_chat(f"@{channel_username}")
-                    channel_id = chat.id
-                except Exception as e:
-                    await message.reply_text(f"❌ Could not find channel @{channel_username}\n\nError: {e}")
-                    return
-            else:
-                await message.reply_text(
-                    "❌ Please forward a message from your channel or send the username (e.g., @yourchannel)"
-                )
-                return
-            
-            # Verify bot is admin
             try:
-                bot_member = await context.bot.get_chat_member(channel_id, context.bot.id)
-                if bot_member.status not in ['administrator', 'creator']:
+                if message.forward_from_chat:
+                    # Forwarded from channel
+                    channel_id = message.forward_from_chat.id
+                    channel_username = message.forward_from_chat.username
+                    bot_member = await self._get_chat_member(context.bot, channel_id, context.bot.id)
+                elif (match := _CHANNEL_RE.match(message.text or "")):
+                    # Username provided: resolve the channel first so our membership is
+                    # cached under its numeric id, which my_chat_member updates invalidate
+                    channel_username = match.group(1)
+                    async with self._typing(message.chat):
+                        chat = await self._get_chat(context.bot, f"@{channel_username}")
+                        channel_id = chat.id
+                        bot_member = await self._get_chat_member(context.bot, channel_id, context.bot.id)
+                else:
                     await message.reply_text(
-                        "❌ Bot is not an admin in this channel!\n\n"
-                        "Please make the bot an admin and try again."
+                        "❌ Please forward a message from your channel or send the username (e.g., @yourchannel)"
                     )
                     return
             except Exception as e:
                 await message.reply_text(f"❌ Error checking channel: {e}")
                 return
             
+            # Verify bot is admin
+            if bot_member.status not in ['administrator', 'creator']:
+                await message.reply_text(
+                    "❌ Bot is not an admin in this channel!\n\n"
+                    "Please make the bot an admin and try again."
+                )
+                return
+            
             # Save and proceed to next step
             state["data"]["channel_id"] = channel_id
             state["data"]["channel_username"] = channel_username
             state["step"] = "group"
+            await self._setup_state.put(user.id, state)
             
             await message.reply_text(
-                "✅ *Channel verified!*\n\n"
+                "✅ <b>Channel verified!</b>\n\n"
                 f"📢 Channel: @{channel_username}\n\n"
-                "*Step 2/3: Private Group*\n\n"
-                "Now send me the *private group* link or forward a message from it.\n\n"
+                "<b>Step 2/3: Private Group</b>\n\n"
+                "Now send me the <b>private group</b> link or forward a message from it.\n\n"
                 "Make sure the bot is an admin in the group with invite permissions!",
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=ParseMode.HTML
             )
         
         elif step == "group":
@@ -862,55 +1085,54 @@ Select an option below:
             group_id = None
             group_title = None
             
-            if message.forward_from_chat:
-                group_id = message.forward_from_chat.id
-                group_title = message.forward_from_chat.title
-            elif message.text and ("t.me/" in message.text or message.text.startswith("-")):
-                # Group link or ID
-                try:
-                    if message.text.startswith("-"):
-                        group_id = int(message.text)
-                    else:
-                        # Try to extract from link
+            try:
+                if message.forward_from_chat:
+                    group_id = message.forward_from_chat.id
+                    group_title = message.forward_from_chat.title
+                    bot_member = await self._get_chat_member(context.bot, group_id, context.bot.id)
+                elif (match := _GROUP_RE.match(message.text or "")):
+                    # Group link or ID
+                    if not match.group(1):
                         await message.reply_text(
                             "❌ Please forward a message from the group instead of sending a link."
                         )
                         return
                     
-                    chat = await context.bot.get_chat(group_id)
-                    group_title = chat.title
-                except Exception as e:
-                    await message.reply_text(f"❌ Could not access group: {e}")
-                    return
-            else:
-                await message.reply_text(
-                    "❌ Please forward a message from your private group."
-                )
-                return
-            
-            # Verify bot is admin with invite permissions
-            try:
-                bot_member = await context.bot.get_chat_member(group_id, context.bot.id)
-                if bot_member.status not in ['administrator', 'creator']:
-                    await message.reply_text(
-                        "❌ Bot is not an admin in this group!\n\n"
-                        "Please make the bot an admin with 'Invite Users' permission."
+                    # Look up the group and our membership together
+                    group_id = int(match.group(1))
+                    chat, bot_member = await asyncio.gather(
+                        self._get_chat(context.bot, group_id),
+                        self._get_chat_member(context.bot, group_id, context.bot.id)
                     )
-                    return
-                if not bot_member.can_invite_users:
+                    group_title = chat.title
+                else:
                     await message.reply_text(
-                        "❌ Bot doesn't have 'Invite Users' permission!\n\n"
-                        "Please enable this permission for the bot."
+                        "❌ Please forward a message from your private group."
                     )
                     return
             except Exception as e:
                 await message.reply_text(f"❌ Error checking group: {e}")
                 return
             
+            # Verify bot is admin with invite permissions
+            if bot_member.status not in ['administrator', 'creator']:
+                await message.reply_text(
+                    "❌ Bot is not an admin in this group!\n\n"
+                    "Please make the bot an admin with 'Invite Users' permission."
+                )
+                return
+            if not bot_member.can_invite_users:
+                await message.reply_text(
+                    "❌ Bot doesn't have 'Invite Users' permission!\n\n"
+                    "Please enable this permission for the bot."
+                )
+                return
+            
             # Save and proceed to confirmation
             state["data"]["group_id"] = group_id
             state["data"]["group_title"] = group_title
             state["step"] = "confirm"
+            await self._setup_state.put(user.id, state)
             
             keyboard = [
                 [
@@ -921,13 +1143,13 @@ Select an option below:
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             await message.reply_text(
-                "✅ *Group verified!*\n\n"
-                f"*Step 3/3: Confirm Setup*\n\n"
-                f"📢 *Public Channel:* @{state['data']['channel_username']}\n"
-                f"🔒 *Private Group:* {group_title}\n\n"
+                "✅ <b>Group verified!</b>\n\n"
+                f"<b>Step 3/3: Confirm Setup</b>\n\n"
+                f"📢 <b>Public Channel:</b> @{state['data']['channel_username']}\n"
+                f"🔒 <b>Private Group:</b> {_escape(group_title)}\n\n"
                 f"Users will verify in the public channel to get access to the private group.\n\n"
-                f"Click *Create Portal* to finish setup.",
-                parse_mode=ParseMode.MARKDOWN,
+                f"Click <b>Create Portal</b> to finish setup.",
+                parse_mode=ParseMode.HTML,
                 reply_markup=reply_markup
             )
     
@@ -936,187 +1158,194 @@ Select an option below:
         query = update.callback_query
         await query.answer()
         
-        user = query.from_user
-        data = query.data
-        
-        # Portal verification callback
-        if data.startswith("portal_verify:"):
-            portal_id = data.split(":")[1]
-            result = await self.portal_service.verify_user(
-                portal_id=portal_id,
-                user_id=user.id,
-                username=user.username
-            )
-            
-            if result.get("success"):
-                await query.message.reply_text(
-                    format_verification_success(
-                        result.get("group_title", "Private Group"),
-                        result.get("invite_link"),
-                        config.PORTAL_INVITE_EXPIRY_MINUTES
-                    ),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.message.reply_text(f"❌ {result.get('message', 'Verification failed')}")
-            return
+        # callback_data is "<action>" or "<action>:<portal_id>"
+        action, _, arg = query.data.partition(":")
+        if arg and not is_valid_portal_id(arg):
+            return  # Forged or stale callback data; keep it away from the DB
+        handler = self._callback_handlers.get(action)
+        if handler:
+            await handler(query, query.from_user, arg)
+    
+    async def _cb_portal_verify(self, query, user, portal_id: str):
+        """Portal verification callback"""
+        result = await self.portal_service.verify_user(
+            portal_id=portal_id,
+            user_id=user.id,
+            username=user.username
+        )
         
-        # Portal setup confirmation
-        if data == "portal_setup_confirm":
-            state = self._setup_state.get(user.id)
-            if not state or state.get("step") != "confirm":
-                await query.edit_message_text("❌ Setup session expired. Please start again with /portal setup")
-                return
-            
-            # Create the portal
-            portal_id = await self.portal_service.create_portal(
-                owner_id=user.id,
-                public_channel_id=state["data"]["channel_id"],
-                public_channel_username=state["data"]["channel_username"],
-                private_group_id=state["data"]["group_id"],
-                private_group_title=state["data"]["group_title"]
+        if result.get("success"):
+            await query.message.reply_text(
+                format_verification_success(
+                    result.get("group_title", "Private Group"),
+                    result.get("invite_link"),
+                    config.PORTAL_INVITE_EXPIRY_MINUTES
+                ),
+                parse_mode=ParseMode.HTML
             )
-            
-            # Clear setup state
-            del self._setup_state[user.id]
-            
-            if portal_id:
-                await query.edit_message_text(
-                    format_portal_setup_message(
-                        portal_id,
-                        state["data"]["channel_username"],
-                        state["data"]["group_title"]
-                    ),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text("❌ Failed to create portal. Please try again.")
-            return
-        
-        if data == "portal_setup_cancel":
-            if user.id in self._setup_state:
-                del self._setup_state[user.id]
-            await query.edit_message_text("❌ Portal setup cancelled.")
-            return
-        
-        # Portal toggle active
-        if data.startswith("portal_toggle:"):
-            portal_id = data.split(":")[1]
-            portal = await self.db.get_portal(portal_id)
-            if portal and portal.get("owner_id") == user.id:
-                new_status = not portal.get("is_active")
-                await self.db.update_portal_settings(portal_id, is_active=new_status)
-                status = "✅ Enabled" if new_status else "❌ Disabled"
-                await query.edit_message_text(f"Portal status changed to: {status}")
-            return
-        
-        # Portal require username toggle
-        if data.startswith("portal_req_username:"):
-            portal_id = data.split(":")[1]
-            portal = await self.db.get_portal(portal_id)
-            if portal and portal.get("owner_id") == user.id:
-                new_status = not portal.get("require_username")
-                await self.db.update_portal_settings(portal_id, require_username=new_status)
-                await query.answer(f"Username requirement: {'On' if new_status else 'Off'}")
-            return
-        
-        # Portal require photo toggle
-        if data.startswith("portal_req_photo:"):
-            portal_id = data.split(":")[1]
-            portal = await self.db.get_portal(portal_id)
-            if portal and portal.get("owner_id") == user.id:
-                new_status = not portal.get("require_profile_photo")
-                await self.db.update_portal_settings(portal_id, require_profile_photo=new_status)
-                await query.answer(f"Photo requirement: {'On' if new_status else 'Off'}")
+        else:
+            await query.message.reply_text(f"❌ {result.get('message', 'Verification failed')}")
+    
+    async def _cb_portal_setup_confirm(self, query, user, arg: str):
+        """Portal setup confirmation"""
+        state = await self._setup_state.get(user.id)
+        if not state or state.get("step") != "confirm":
+            await query.edit_message_text("❌ Setup session expired. Please start again with /portal setup")
             return
         
-        # Portal delete confirmation
-        if data.startswith("portal_confirm_delete:"):
-            portal_id = data.split(":")[1]
-            portal = await self.db.get_portal(portal_id)
-            if portal and portal.get("owner_id") == user.id:
-                await self.db.delete_portal(portal_id)
-                await query.edit_message_text("✅ Portal deleted successfully.")
-            return
+        # Create the portal
+        portal_id = await self.portal_service.create_portal(
+            owner_id=user.id,
+            public_channel_id=state["data"]["channel_id"],
+            public_channel_username=state["data"]["channel_username"],
+            private_group_id=state["data"]["group_id"],
+            private_group_title=state["data"]["group_title"]
+        )
         
-        if data == "portal_cancel_delete":
-            await query.edit_message_text("❌ Delete cancelled.")
-            return
+        # Clear setup state
+        await self._setup_state.delete(user.id)
         
-        # Original callbacks
-        if data == "subscribe":
-            chat_id = query.message.chat_id
-            await self.db.create_or_update_user(user.id, user.username)
-            await self.db.add_subscription(user.id, chat_id, "all")
+        if portal_id:
             await query.edit_message_text(
-                "✅ *Subscribed to MegaETH Alerts!*\n\n"
-                "You'll receive notifications for:\n"
-                "• New token launches\n"
-                "• Price pumps/dumps\n"
-                "• Volume spikes\n\n"
-                "Use /alerts to manage your subscription.",
-                parse_mode=ParseMode.MARKDOWN
+                format_portal_setup_message(
+                    portal_id,
+                    state["data"]["channel_username"],
+                    state["data"]["group_title"]
+                ),
+                parse_mode=ParseMode.HTML
             )
-        
-        elif data == "subscribe_here":
-            chat_id = query.message.chat_id
-            await self.db.add_subscription(user.id, chat_id, "all")
-            await query.edit_message_text("✅ Subscribed! You'll receive alerts in this chat.")
-        
-        elif data == "toggle_alerts":
-            user_data = await self.db.get_user(user.id)
-            new_status = not user_data.get("alerts_enabled", True)
-            await self.db.update_user_settings(user.id, alerts_enabled=new_status)
+        else:
+            await query.edit_message_text("❌ Failed to create portal. Please try again.")
+    
+    async def _cb_portal_setup_cancel(self, query, user, arg: str):
+        """Portal setup cancelled"""
+        await self._setup_state.delete(user.id)
+        await query.edit_message_text("❌ Portal setup cancelled.")
+    
+    async def _cb_portal_toggle(self, query, user, portal_id: str):
+        """Portal toggle active"""
+        new_status = await self.db.toggle_portal_setting(portal_id, user.id, "is_active")
+        if new_status is not None:
+            self.portal_service.invalidate_portal(portal_id)
+            status = "✅ Enabled" if new_status else "❌ Disabled"
+            await query.edit_message_text(f"Portal status changed to: {status}")
+    
+    async def _cb_portal_req_username(self, query, user, portal_id: str):
+        """Portal require username toggle"""
+        new_status = await self.db.toggle_portal_setting(portal_id, user.id, "require_username")
+        if new_status is not None:
+            self.portal_service.invalidate_portal(portal_id)
+            await query.answer(f"Username requirement: {'On' if new_status else 'Off'}")
+    
+    async def _cb_portal_req_photo(self, query, user, portal_id: str):
+        """Portal require photo toggle"""
+        new_status = await self.db.toggle_portal_setting(portal_id, user.id, "require_profile_photo")
+        if new_status is not None:
+            self.portal_service.invalidate_portal(portal_id)
+            await query.answer(f"Photo requirement: {'On' if new_status else 'Off'}")
+    
+    async def _cb_portal_confirm_delete(self, query, user, portal_id: str):
+        """Portal delete confirmation"""
+        portal = await self.db.get_portal(portal_id)
+        if portal and portal.owner_id == user.id:
+            await self.db.delete_portal(portal_id)
+            self.portal_service.invalidate_portal(portal_id)
+            await self.portal_service.drop_invite_pool(portal.private_group_id)
+            await query.edit_message_text("✅ Portal deleted successfully.")
+    
+    async def _cb_portal_cancel_delete(self, query, user, arg: str):
+        """Portal delete cancelled"""
+        await query.edit_message_text("❌ Delete cancelled.")
+    
+    async def _cb_subscribe(self, query, user, arg: str):
+        """Subscribe from the /start keyboard"""
+        chat_id = query.message.chat_id
+        await self.db.create_or_update_user(user.id, user.username)
+        await self.db.add_subscription(user.id, chat_id, "all")
+        await query.edit_message_text(
+            "✅ <b>Subscribed to MegaETH Alerts!</b>\n\n"
+            "You'll receive notifications for:\n"
+            "• New token launches\n"
+            "• Price pumps/dumps\n"
+            "• Volume spikes\n\n"
+            "Use /alerts to manage your subscription.",
+            parse_mode=ParseMode.HTML
+        )
+    
+    async def _cb_subscribe_here(self, query, user, arg: str):
+        """Subscribe the current chat from /alerts"""
+        chat_id = query.message.chat_id
+        # Anyone in the chat can press the button; alerts only reach subscriptions with a users row
+        await self.db.create_or_update_user(user.id, user.username)
+        await self.db.add_subscription(user.id, chat_id, "all")
+        await query.edit_message_text("✅ Subscribed! You'll receive alerts in this chat.")
+    
+    async def _cb_toggle_alerts(self, query, user, arg: str):
+        """Toggle alerts from /alerts"""
+        new_status = await self.db.toggle_user_alerts(user.id)
+        if new_status is not None:
             status = "✅ Enabled" if new_status else "❌ Disabled"
             await query.edit_message_text(f"Alert status changed to: {status}")
-        
-        elif data == "trending":
-            await query.edit_message_text("🔄 Fetching trending tokens...")
-            pairs = await self.alert_service.get_trending_pairs(5)
-            if pairs:
-                message = "📈 *Top 5 Trending Tokens*\n\n"
-                for i, pair in enumerate(pairs, 1):
-                    message += f"{i}. {pair.base_token_symbol}: {pair.format_price()}\n"
-                await query.edit_message_text(message, parse_mode=ParseMode.MARKDOWN)
-        
-        elif data == "new_pairs":
-            await query.edit_message_text("🔄 Fetching new pairs...")
-            pairs = await self.alert_service.get_new_pairs(24)
-            if pairs:
-                message = "🆕 *New Tokens (24h)*\n\n"
-                for pair in pairs[:5]:
-                    age = pair.get_age_minutes()
-                    age_str = f"{int(age)}m" if age and age < 60 else f"{age/60:.1f}h" if age else "?"
-                    message += f"• {pair.base_token_symbol} ({age_str})\n"
-                await query.edit_message_text(message, parse_mode=ParseMode.MARKDOWN)
+    
+    async def _cb_trending(self, query, user, arg: str):
+        """Top 5 trending tokens from the /start keyboard"""
+        await query.edit_message_text("🔄 Fetching trending tokens...")
+        pairs = await self._cached("trending:5", lambda: self.alert_service.get_trending_pairs(5))
+        if pairs:
+            rows = [f"{i}. {_escape(p.base_token_symbol)}: {p.format_price()}" for i, p in enumerate(pairs, 1)]
+            message = TOP_TRENDING_HEADER + "\n".join(rows)
+            await query.edit_message_text(message, parse_mode=ParseMode.HTML)
+    
+    async def _cb_new_pairs(self, query, user, arg: str):
+        """Newest tokens from the /start keyboard"""
+        await query.edit_message_text("🔄 Fetching new pairs...")
+        pairs = await self._cached("new:24", lambda: self.alert_service.get_new_pairs(24))
+        if pairs:
+            rows = [f"• {_escape(p.base_token_symbol)} ({_fmt_age(p.get_age_minutes(), '?')})" for p in pairs[:5]]
+            message = NEW_PAIRS_HEADER + "\n".join(rows)
+            await query.edit_message_text(message, parse_mode=ParseMode.HTML)
     
     def setup_handlers(self, application: Application):
         """Setup all command and message handlers"""
-        application.add_handler(CommandHandler("start", self.start_command))
-        application.add_handler(CommandHandler("help", self.help_command))
-        application.add_handler(CommandHandler("alerts", self.alerts_command))
-        application.add_handler(CommandHandler("subscribe", self.subscribe_command))
-        application.add_handler(CommandHandler("unsubscribe", self.unsubscribe_command))
-        application.add_handler(CommandHandler("trending", self.trending_command))
-        application.add_handler(CommandHandler("new", self.new_command))
-        application.add_handler(CommandHandler("gainers", self.gainers_command))
-        application.add_handler(CommandHandler("losers", self.losers_command))
-        application.add_handler(CommandHandler("search", self.search_command))
-        application.add_handler(CommandHandler("price", self.price_command))
-        application.add_handler(CommandHandler("chat", self.chat_command))
-        application.add_handler(CommandHandler("setchat", self.setchat_command))
-        application.add_handler(CommandHandler("portal", self.portal_command))
-        application.add_handler(CallbackQueryHandler(self.button_callback))
-        application.add_handler(ChatMemberHandler(self.handle_chat_member, ChatMemberHandler.CHAT_MEMBER))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
+        commands = (
+            ("start", self.start_command),
+            ("help", self.help_command),
+            ("alerts", self.alerts_command),
+            ("subscribe", self.subscribe_command),
+            ("unsubscribe", self.unsubscribe_command),
+            ("trending", self.trending_command),
+            ("new", self.new_command),
+            ("gainers", self.gainers_command),
+            ("losers", self.losers_command),
+            ("search", self.search_command),
+            ("price", self.price_command),
+            ("chat", self.chat_command),
+            ("setchat", self.setchat_command),
+            ("portal", self.portal_command),
+        )
+        handlers = [CommandHandler(name, callback) for name, callback in commands]
+        handlers += [
+            # Verification clicks don't block the update loop, so a burst of them
+            # reaches PortalService together and is verified as one batch
+            CallbackQueryHandler(self.button_callback, pattern=r"^portal_verify:", block=False),
+            CallbackQueryHandler(self.button_callback),
+            ChatMemberHandler(self.handle_chat_member, ChatMemberHandler.CHAT_MEMBER),
+            ChatMemberHandler(self.handle_my_chat_member, ChatMemberHandler.MY_CHAT_MEMBER),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message),
+        ]
+        application.add_handlers(handlers)
+        # Runs first (group -1) and stops further handling of wizard messages
+        application.add_handler(
+            MessageHandler(
+                filters.UpdateType.MESSAGE & ~filters.COMMAND & SetupStateFilter(self._setup_state),
+                self.handle_setup_message
+            ),
+            group=-1
+        )
     
     async def run(self):
         """Run the bot"""
-        # Validate required environment variables
-        if not config.TELEGRAM_BOT_TOKEN:
-            logger.error("TELEGRAM_BOT_TOKEN is not set!")
-            sys.exit(1)
-        
+        # TELEGRAM_BOT_TOKEN is validated when config is loaded
         if not config.MOGRA_API_KEY:
             logger.warning("MOGRA_API_KEY is not set - AI chat will not work")
         
@@ -1126,8 +1355,25 @@ Select an option below:
         # Start health check server for Railway
         await self._start_health_server()
         
-        # Create application
-        self.application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+        # Create application with Telegram's flood limits enforced on every outbound call.
+        # Long polling holds a connection open, so it gets its own pool and can't starve sends.
+        self.application = (
+            Application.builder()
+            .token(config.TELEGRAM_BOT_TOKEN)
+            .request(HTTPXRequest(
+                connection_pool_size=config.CONNECTION_POOL_SIZE,
+                pool_timeout=config.POOL_TIMEOUT
+            ))
+            .get_updates_request(HTTPXRequest(connection_pool_size=4, pool_timeout=60.0))
+            .rate_limiter(AIORateLimiter(
+                overall_max_rate=30,
+                overall_time_period=1,
+                group_max_rate=20,
+                group_time_period=60,
+                max_retries=3
+            ))
+            .build()
+        )
         
         # Initialize portal service (needs bot instance)
         self.portal_service = PortalService(self.application.bot, self.db)
@@ -1135,43 +1381,54 @@ Select an option below:
         # Setup handlers
         self.setup_handlers(self.application)
         
-        # Set bot commands
-        commands = [
-            BotCommand("start", "Start the bot"),
-            BotCommand("help", "Show help"),
-            BotCommand("alerts", "Manage alert settings"),
-            BotCommand("subscribe", "Subscribe to alerts"),
-            BotCommand("trending", "View trending tokens"),
-            BotCommand("new", "View new tokens"),
-            BotCommand("gainers", "Top gaining tokens"),
-            BotCommand("losers", "Top losing tokens"),
-            BotCommand("search", "Search for a token"),
-            BotCommand("price", "Get token price"),
-            BotCommand("chat", "Start AI chat"),
-            BotCommand("portal", "Manage verification portals"),
-        ]
-        await self.application.bot.set_my_commands(commands)
-        
-        # Start alert service
-        await self.alert_service.start()
-        
         # Run the bot
         logger.info("🚀 Starting MegaETH Telegram Bot...")
         logger.info(f"Environment: {config.RAILWAY_ENVIRONMENT}")
         logger.info(f"Health check port: {config.PORT}")
         
         await self.application.initialize()
-        await self.application.start()
-        await self.application.updater.start_polling(drop_pending_updates=True, allowed_updates=["message", "callback_query", "chat_member"])
+        # Independent startup steps overlap; update delivery starts once they're done.
+        # The command menu is registered once; Telegram serves it natively from then on.
+        await asyncio.gather(
+            self.application.bot.set_my_commands(BOT_COMMANDS),
+            self.alert_service.start(),
+            self.application.start()
+        )
+        if config.RAILWAY_PUBLIC_DOMAIN:
+            await self.application.bot.set_webhook(
+                url=f"https://{config.RAILWAY_PUBLIC_DOMAIN}/{config.TELEGRAM_BOT_TOKEN}",
+                allowed_updates=ALLOWED_UPDATES,
+                drop_pending_updates=True,
+                secret_token=self._webhook_secret
+            )
+            logger.info(f"Receiving updates via webhook on {config.RAILWAY_PUBLIC_DOMAIN}")
+        else:
+            await self.application.updater.start_polling(
+                poll_interval=0.0,
+                timeout=POLL_TIMEOUT_SECONDS,
+                bootstrap_retries=-1,
+                drop_pending_updates=True,
+                allowed_updates=ALLOWED_UPDATES
+            )
+        
+        # Keep running until SIGTERM (Railway redeploys) or SIGINT
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._stop_event.set)
+            except NotImplementedError:
+                pass  # Windows: Ctrl+C still raises KeyboardInterrupt
         
-        # Keep running
         try:
-            while True:
-                await asyncio.sleep(1)
+            await self._stop_event.wait()
+            logger.info("Shutting down...")
         except (KeyboardInterrupt, SystemExit):
             logger.info("Shutting down...")
         finally:
-            await self.application.updater.stop()
+            if self.application.updater.running:
+                await self.application.updater.stop()
+            # Revokes pooled invite links, so it runs while the bot can still call Telegram
+            await self.portal_service.close()
             await self.application.stop()
             await self.application.shutdown()
             await self.shutdown()
@@ -1184,4 +1441,9 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # Optional: faster libuv-based event loop (not available on Windows)
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
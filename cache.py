@@ -0,0 +1,71 @@
+"""
+Cache Utilities
+Small in-process caches shared by the bot services
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after being set
+
+    Implements the subset of the cachetools.TTLCache interface the bot uses.
+    Once `maxsize` entries are stored the oldest one is evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def _expire(self, now: float):
+        """Drop expired entries (kept in expiry order at the front)"""
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        expires_at, value = self._data[key]
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        now = time.monotonic()
+        self._expire(now)
+        self._data.pop(key, None)
+        self._data[key] = (now + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __delitem__(self, key: Hashable):
+        del self._data[key]
+
+    def __len__(self) -> int:
+        self._expire(time.monotonic())
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        del self._data[key]
+        return value
+
+    def clear(self):
+        self._data.clear()
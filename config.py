@@ -3,7 +3,10 @@ Configuration settings for the MegaETH Telegram Bot
 Reads from environment variables (Railway compatible)
 """
 import os
+from dataclasses import dataclass
 
+
+@dataclass(frozen=True, slots=True)
 class Config:
     # Telegram Bot Token (get from @BotFather)
     TELEGRAM_BOT_TOKEN: str = os.environ.get("TELEGRAM_BOT_TOKEN", "")
@@ -25,14 +28,31 @@ class Config:
     
     # Database (SQLite for tracking seen tokens)
     DATABASE_PATH: str = os.environ.get("DATABASE_PATH", "/app/data/megaeth_bot.db")
+    DATABASE_TIMEOUT: float = float(os.environ.get("DATABASE_TIMEOUT", "10"))
+    
+    # Bot API HTTP connection pool for outbound calls (polling uses its own small pool)
+    CONNECTION_POOL_SIZE: int = int(os.environ.get("CONNECTION_POOL_SIZE", "32"))
+    POOL_TIMEOUT: float = float(os.environ.get("POOL_TIMEOUT", "10.0"))
+    
+    # Redis for portal setup wizard state (optional; kept in memory when unset)
+    REDIS_URL: str = os.environ.get("REDIS_URL", "")
     
     # Railway specific
     PORT: int = int(os.environ.get("PORT", "8080"))
     RAILWAY_ENVIRONMENT: str = os.environ.get("RAILWAY_ENVIRONMENT", "development")
+    # Public hostname; when set, Telegram pushes updates to a webhook instead of polling
+    RAILWAY_PUBLIC_DOMAIN: str = os.environ.get("RAILWAY_PUBLIC_DOMAIN", "")
+    # Secret Telegram sends with every webhook update; generated per process when unset
+    # (set it when several workers share one webhook)
+    WEBHOOK_SECRET: str = os.environ.get("WEBHOOK_SECRET", "")
     
     # Portal Settings
     PORTAL_INVITE_EXPIRY_MINUTES: int = int(os.environ.get("PORTAL_INVITE_EXPIRY_MINUTES", "5"))
     PORTAL_MAX_USES: int = int(os.environ.get("PORTAL_MAX_USES", "1"))
+    
+    def __post_init__(self):
+        if not self.TELEGRAM_BOT_TOKEN:
+            raise RuntimeError("TELEGRAM_BOT_TOKEN is not set!")
 
 
 config = Config()
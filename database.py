@@ -4,8 +4,11 @@ SQLite database for tracking seen tokens, user settings, and alert history
 Supports Railway persistent storage
 """
 import os
+import time
 import asyncio
-from typing import List, Dict, Any, Optional, Set
+import sqlite3
+from dataclasses import dataclass, fields
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Awaitable
 import logging
 import aiosqlite
 
@@ -13,6 +16,241 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+# RETURNING lets a write hand back the affected row without a follow-up SELECT
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# sqlite3 caches compiled statements per connection keyed by SQL text, so hot
+# queries live in module constants and every caller reuses the same statement
+_STATEMENT_CACHE_SIZE = 256
+
+# Rows per fetchmany() when loading large tables
+_FETCH_CHUNK_SIZE = 1000
+
+# Readers name the columns callers use rather than SELECT *, skipping
+# bookkeeping columns such as the surrogate id and updated_at
+_USER_COLS = (
+    "telegram_id, username, mogra_chat_id, alerts_enabled, "
+    "min_volume_usd, min_liquidity_usd, price_change_threshold"
+)
+
+
+
+@dataclass(frozen=True, slots=True)
+class Portal:
+    """A portals row as read by the portal readers; flags are stored as 0/1"""
+    portal_id: str
+    owner_id: int
+    public_channel_id: int
+    public_channel_username: Optional[str]
+    private_group_id: int
+    private_group_title: Optional[str]
+    welcome_message: Optional[str]
+    verification_type: str
+    captcha_enabled: int
+    min_account_age_days: int
+    require_profile_photo: int
+    require_username: int
+    is_active: int
+    created_at: str
+    verified_count: int
+    pending_count: int
+    banned_count: int
+
+
+@dataclass(frozen=True, slots=True)
+class VerificationRecord:
+    """A portal_verifications row"""
+    portal_id: str
+    user_id: int
+    username: Optional[str]
+    status: str
+    verified_at: Optional[str]
+    invite_link: Optional[str]
+    invite_expires_at: Optional[str]
+    created_at: str
+
+
+# Selected in field order so rows map straight onto the records
+_PORTAL_COLS = ", ".join(field.name for field in fields(Portal))
+
+_VERIFICATION_COLS = ", ".join(field.name for field in fields(VerificationRecord))
+
+_GET_USER_SQL = f"SELECT {_USER_COLS} FROM users WHERE telegram_id = ?"
+
+_GET_PORTAL_SQL = f"SELECT {_PORTAL_COLS} FROM portals WHERE portal_id = ?"
+
+_GET_PORTAL_BY_CHANNEL_SQL = f"SELECT {_PORTAL_COLS} FROM portals WHERE public_channel_id = ? AND is_active = 1"
+
+_GET_PORTAL_BY_GROUP_SQL = f"SELECT {_PORTAL_COLS} FROM portals WHERE private_group_id = ? AND is_active = 1"
+
+_GET_VERIFICATION_SQL = f"SELECT {_VERIFICATION_COLS} FROM portal_verifications WHERE portal_id = ? AND user_id = ?"
+
+_GET_PORTAL_STATS_SQL = "SELECT verified_count, pending_count, banned_count FROM portals WHERE portal_id = ?"
+
+_MARK_SEEN_SQL = """
+    INSERT INTO seen_tokens (pair_address, token_symbol, token_name, last_alert_at, alert_count)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP, 1)
+    ON CONFLICT(pair_address) DO UPDATE SET
+        last_alert_at = CURRENT_TIMESTAMP,
+        alert_count = seen_tokens.alert_count + 1
+"""
+
+# Shared by log_alert and log_alerts_bulk so both reuse one compiled statement
+_LOG_ALERT_SQL = """
+    INSERT INTO alert_history (telegram_id, chat_id, pair_address, alert_type, message)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_UPSERT_USER_SQL = """
+    INSERT INTO users (telegram_id, username, mogra_chat_id)
+    VALUES (?, ?, ?)
+    ON CONFLICT(telegram_id) DO UPDATE SET
+        username = COALESCE(excluded.username, users.username),
+        mogra_chat_id = COALESCE(excluded.mogra_chat_id, users.mogra_chat_id),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+_UPSERT_USER_RETURNING_SQL = f"{_UPSERT_USER_SQL} RETURNING {_USER_COLS}"
+
+# create_or_update_user mostly sees users that already exist with nothing new;
+# split into insert + conditional update, such calls don't write a page at all.
+# Both take (telegram_id, username, mogra_chat_id).
+_INSERT_USER_SQL = "INSERT OR IGNORE INTO users (telegram_id, username, mogra_chat_id) VALUES (?1, ?2, ?3)"
+
+_UPDATE_USER_SQL = """
+    UPDATE users SET
+        username = COALESCE(?2, username),
+        mogra_chat_id = COALESCE(?3, mogra_chat_id),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE telegram_id = ?1
+      AND ((?2 IS NOT NULL AND username IS NOT ?2) OR (?3 IS NOT NULL AND mogra_chat_id IS NOT ?3))
+"""
+
+# Notes a verification attempt as pending unless the user already has a record
+_CREATE_VERIFICATION_SQL = """
+    INSERT INTO portal_verifications (portal_id, user_id, username, status)
+    VALUES (?, ?, ?, 'pending')
+    ON CONFLICT DO NOTHING
+"""
+
+# Records the outcome of a verification in one write, creating the row if needed
+_UPSERT_VERIFICATION_SQL = """
+    INSERT INTO portal_verifications (portal_id, user_id, username, status, verified_at,
+                                      invite_link, invite_expires_at)
+    VALUES (?1, ?2, ?3, ?4, CASE WHEN ?4 = 'verified' THEN CURRENT_TIMESTAMP END, ?5, ?6)
+    ON CONFLICT(portal_id, user_id) DO UPDATE SET
+        username = COALESCE(excluded.username, username),
+        status = excluded.status,
+        verified_at = COALESCE(excluded.verified_at, verified_at),
+        invite_link = COALESCE(excluded.invite_link, invite_link),
+        invite_expires_at = COALESCE(excluded.invite_expires_at, invite_expires_at)
+"""
+
+# Row-at-a-time writes and their bulk variants share these statements
+_ADD_SUBSCRIPTION_SQL = """
+    INSERT OR IGNORE INTO subscriptions (telegram_id, chat_id, subscription_type)
+    VALUES (?, ?, ?)
+"""
+
+# An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete doesn't
+# fire the ban counter's delete trigger, so re-bans would be counted twice
+_BAN_USER_SQL = """
+    INSERT INTO portal_banned_users (portal_id, user_id, reason, banned_by)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(portal_id, user_id) DO UPDATE SET
+        reason = excluded.reason,
+        banned_by = excluded.banned_by,
+        banned_at = CURRENT_TIMESTAMP
+"""
+
+# Every write goes through the batch writer, which owns the shared connection's
+# transaction: up to this many queued writes, collected for at most this many
+# seconds, share one transaction
+_WRITE_BATCH_SIZE = 256
+_WRITE_BATCH_WINDOW = 0.005
+
+# Alert logging doesn't wait for its write; past this many queued writes new alert
+# rows are dropped rather than letting the backlog grow without bound
+_ALERT_BACKLOG_LIMIT = 10_000
+
+# get_all_subscriptions runs on every alert cycle; its result is reused until a
+# write to users/subscriptions invalidates it, or for at most this many seconds
+# so edits made outside this process still show up
+_SUBSCRIPTIONS_CACHE_TTL = 30.0
+
+# Applied on every connect: WAL lets readers run during a write and, with
+# synchronous=NORMAL, commits no longer fsync the main database file
+_CONNECTION_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA wal_autocheckpoint=10000;
+"""
+
+# portals carries verified/pending/banned counts so get_portal_stats is one row
+# read instead of three COUNT(*) scans. Triggers keep them exact whichever
+# method (or batch) writes the child rows.
+_PORTAL_COUNT_TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS trg_verif_insert AFTER INSERT ON portal_verifications
+    BEGIN
+        UPDATE portals SET
+            pending_count = pending_count + (NEW.status IS 'pending'),
+            verified_count = verified_count + (NEW.status IS 'verified')
+        WHERE portal_id = NEW.portal_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_verif_status AFTER UPDATE OF status ON portal_verifications
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE portals SET
+            pending_count = pending_count - (OLD.status IS 'pending') + (NEW.status IS 'pending'),
+            verified_count = verified_count - (OLD.status IS 'verified') + (NEW.status IS 'verified')
+        WHERE portal_id = NEW.portal_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_verif_delete AFTER DELETE ON portal_verifications
+    BEGIN
+        UPDATE portals SET
+            pending_count = pending_count - (OLD.status IS 'pending'),
+            verified_count = verified_count - (OLD.status IS 'verified')
+        WHERE portal_id = OLD.portal_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_ban_insert AFTER INSERT ON portal_banned_users
+    BEGIN
+        UPDATE portals SET banned_count = banned_count + 1 WHERE portal_id = NEW.portal_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_ban_delete AFTER DELETE ON portal_banned_users
+    BEGIN
+        UPDATE portals SET banned_count = banned_count - 1 WHERE portal_id = OLD.portal_id;
+    END;
+"""
+
+_BACKFILL_PORTAL_COUNTS_SQL = """
+    UPDATE portals SET
+        verified_count = (SELECT COUNT(*) FROM portal_verifications v
+                          WHERE v.portal_id = portals.portal_id AND v.status = 'verified'),
+        pending_count = (SELECT COUNT(*) FROM portal_verifications v
+                         WHERE v.portal_id = portals.portal_id AND v.status = 'pending'),
+        banned_count = (SELECT COUNT(*) FROM portal_banned_users b
+                        WHERE b.portal_id = portals.portal_id)
+"""
+
+# Refresh planner statistics and truncate the WAL this often (seconds)
+_MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+
+def _statement(sql: str, params) -> Callable[[aiosqlite.Cursor], Awaitable[None]]:
+    """Batch writer job running one statement"""
+    async def job(cursor: aiosqlite.Cursor):
+        await cursor.execute(sql, params)
+    return job
+
+
+def _statements(sql: str, rows: List[tuple]) -> Callable[[aiosqlite.Cursor], Awaitable[None]]:
+    """Batch writer job running one statement for every row"""
+    async def job(cursor: aiosqlite.Cursor):
+        await cursor.executemany(sql, rows)
+    return job
+
 
 class DatabaseManager:
     """Manages SQLite database for the bot"""
@@ -20,6 +258,14 @@ class DatabaseManager:
     def __init__(self, db_path: str = None):
         self.db_path = db_path or config.DATABASE_PATH
         self._connection: Optional[aiosqlite.Connection] = None
+        self._seen_pairs: Optional[Set[str]] = None  # Mirror of seen_tokens, loaded by connect()
+        self._banned: Optional[Set[Tuple[str, int]]] = None  # Mirror of portal_banned_users, likewise
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()  # Held by the writer from BEGIN to COMMIT
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._subs_cache: Optional[List[Dict[str, Any]]] = None
+        self._subs_cache_expires = 0.0
         
         # Ensure directory exists for Railway
         db_dir = os.path.dirname(self.db_path)
@@ -27,15 +273,218 @@ class DatabaseManager:
             os.makedirs(db_dir, exist_ok=True)
     
     async def connect(self):
-        """Connect to the database"""
-        self._connection = await aiosqlite.connect(self.db_path)
+        """Connect to the database
+        
+        SQLite allows a single writer, so every handler shares this one long-lived
+        connection (and its worker thread) instead of opening connections per call.
+        """
+        if self._connection:
+            return
+        self._connection = await aiosqlite.connect(
+            self.db_path,
+            timeout=config.DATABASE_TIMEOUT,
+            cached_statements=_STATEMENT_CACHE_SIZE
+        )
+        # Rows are returned as sqlite3.Row, converted to dicts by readers
+        self._connection.row_factory = aiosqlite.Row
+        await self._configure_connection()
         await self._create_tables()
+        # Loaded before any write can run, so no pair or ban added meanwhile is missed
+        await self._load_seen_pairs()
+        await self._load_bans()
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._batch_writer())
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
         logger.info(f"Database connected: {self.db_path}")
     
     async def close(self):
         """Close the database connection"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        if self._writer_task:
+            # Let queued writes commit before the connection goes away
+            await self._write_queue.put(None)
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            # A writer that died early leaves its queue behind; nobody will run it
+            self._fail_writes(self._drain_write_queue(), RuntimeError("Database closed"))
+            self._writer_task = None
+            self._write_queue = None
         if self._connection:
+            try:
+                # Cheap on close: only re-analyzes tables whose stats look stale
+                await self._connection.execute("PRAGMA optimize")
+            except Exception as e:
+                logger.error(f"Error optimizing database: {e}")
             await self._connection.close()
+            self._connection = None
+            self._seen_pairs = None
+            self._banned = None
+            self._subs_cache = None
+    
+    async def _configure_connection(self):
+        """Switch to WAL and apply the connection PRAGMAs"""
+        async with self._connection.execute("PRAGMA journal_mode=WAL") as cursor:
+            journal_mode = (await cursor.fetchone())[0]
+        if journal_mode.lower() != "wal":
+            # e.g. network filesystems without shared memory support
+            logger.warning(f"Could not enable WAL, journal_mode is {journal_mode}")
+        await self._connection.executescript(_CONNECTION_PRAGMAS)
+    
+    async def _maintenance_loop(self):
+        """Run analyze() once every _MAINTENANCE_INTERVAL while connected"""
+        while True:
+            await asyncio.sleep(_MAINTENANCE_INTERVAL)
+            await self.analyze()
+    
+    async def analyze(self) -> bool:
+        """Refresh query planner statistics and truncate the WAL file"""
+        try:
+            async with self._write_lock:
+                await self._connection.execute("ANALYZE")
+                await self._connection.commit()
+                async with self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)"):
+                    pass  # Closing the cursor finishes the statement, so VACUUM can run later
+            return True
+        except Exception as e:
+            logger.error(f"Error running database maintenance: {e}")
+            return False
+    
+    async def vacuum(self) -> bool:
+        """Rebuild the database file to reclaim free pages
+        
+        Rewrites the whole file and blocks every other query meanwhile, so it is
+        never run automatically; call it by hand during quiet periods.
+        """
+        try:
+            async with self._write_lock:
+                await self._connection.execute("VACUUM")
+            return True
+        except Exception as e:
+            logger.error(f"Error vacuuming database: {e}")
+            return False
+    
+    async def _enqueue_write(self, sql: str, params: tuple):
+        """Queue a single statement for the batch writer and wait until it is committed"""
+        await self._submit_write(_statement(sql, params), False)
+    
+    async def _run_write(self, job: Callable[[aiosqlite.Cursor], Awaitable[Any]]) -> Any:
+        """Run `job(cursor)` in the batch writer and return its result once committed
+        
+        The job runs inside its own savepoint, so if it fails none of its
+        statements are kept while the rest of the batch still commits.
+        """
+        return await self._submit_write(job, True)
+    
+    async def _submit_write(self, job: Callable[[aiosqlite.Cursor], Awaitable[Any]], isolated: bool) -> Any:
+        """Queue a job for the batch writer and wait for its result"""
+        if self._writer_task is None or self._writer_task.done():
+            raise RuntimeError("Database writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((job, future, isolated))
+        return await future
+    
+    async def _batch_writer(self):
+        """Run queued writes in batches, one commit (and fsync) per batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._write_queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + _WRITE_BATCH_WINDOW
+            while len(batch) < _WRITE_BATCH_SIZE:
+                try:
+                    item = await asyncio.wait_for(self._write_queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._run_write_batch(batch)
+            except BaseException as e:
+                # Keep serving later writes; nobody waiting on this batch may hang
+                logger.error(f"Error running write batch: {e!r}")
+                self._fail_writes(batch, e)
+                if not isinstance(e, Exception):
+                    self._fail_writes(self._drain_write_queue(), e)
+                    raise
+            if stopping:
+                return
+    
+    def _drain_write_queue(self) -> List[tuple]:
+        """Take every write still queued"""
+        items = []
+        while not self._write_queue.empty():
+            item = self._write_queue.get_nowait()
+            if item is not None:
+                items.append(item)
+        return items
+    
+    @staticmethod
+    def _fail_writes(batch: List[tuple], error: BaseException):
+        """Fail (or cancel, if the writer itself was cancelled) every write still awaited"""
+        for _, future, _ in batch:
+            if future is None or future.done():
+                continue
+            if isinstance(error, Exception):
+                future.set_exception(error)
+            else:
+                future.cancel()
+    
+    async def _run_write_batch(self, batch: List[tuple]):
+        """Execute a batch in one transaction; each caller gets its own write's outcome"""
+        results: List[Any] = []
+        errors: List[Optional[Exception]] = []
+        async with self._write_lock:
+            async with self._connection.cursor() as cursor:
+                try:
+                    await cursor.execute("BEGIN")
+                except Exception as e:
+                    batch_error = e
+                else:
+                    batch_error = None
+                for job, _, isolated in batch:
+                    if batch_error:
+                        results.append(None)
+                        errors.append(batch_error)
+                        continue
+                    try:
+                        if isolated:
+                            await cursor.execute("SAVEPOINT job")
+                        try:
+                            results.append(await job(cursor))
+                        except Exception:
+                            if isolated:
+                                await cursor.execute("ROLLBACK TO job")
+                                await cursor.execute("RELEASE job")
+                            raise
+                        if isolated:
+                            await cursor.execute("RELEASE job")
+                        errors.append(None)
+                    except Exception as e:
+                        results.append(None)
+                        errors.append(e)
+            try:
+                await self._connection.commit()
+            except Exception as e:
+                errors = [error or e for error in errors]
+                await self._connection.rollback()
+        
+        for (_, future, _), result, error in zip(batch, results, errors):
+            if future is None:
+                if error:  # Fire-and-forget write, nobody to report to
+                    logger.error(f"Error in background write: {error}")
+                continue
+            if future.done():
+                continue  # Caller was cancelled
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
     
     async def _create_tables(self):
         """Create necessary tables if they don't exist"""
@@ -45,7 +494,7 @@ class DatabaseManager:
                     telegram_id INTEGER PRIMARY KEY,
                     username TEXT,
                     mogra_chat_id TEXT,
-                    alerts_enabled BOOLEAN DEFAULT 1,
+                    alerts_enabled INTEGER DEFAULT 1 CHECK (alerts_enabled IN (0, 1)),
                     min_volume_usd REAL DEFAULT 1000,
                     min_liquidity_usd REAL DEFAULT 500,
                     price_change_threshold REAL DEFAULT 10.0,
@@ -112,13 +561,16 @@ class DatabaseManager:
                     private_group_title TEXT,
                     welcome_message TEXT,
                     verification_type TEXT DEFAULT 'button',
-                    captcha_enabled BOOLEAN DEFAULT 0,
+                    captcha_enabled INTEGER DEFAULT 0 CHECK (captcha_enabled IN (0, 1)),
                     min_account_age_days INTEGER DEFAULT 0,
-                    require_profile_photo BOOLEAN DEFAULT 0,
-                    require_username BOOLEAN DEFAULT 0,
-                    is_active BOOLEAN DEFAULT 1,
+                    require_profile_photo INTEGER DEFAULT 0 CHECK (require_profile_photo IN (0, 1)),
+                    require_username INTEGER DEFAULT 0 CHECK (require_username IN (0, 1)),
+                    is_active INTEGER DEFAULT 1 CHECK (is_active IN (0, 1)),
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    verified_count INTEGER DEFAULT 0,
+                    pending_count INTEGER DEFAULT 0,
+                    banned_count INTEGER DEFAULT 0
                 )
             """)
             
@@ -150,36 +602,115 @@ class DatabaseManager:
                 )
             """)
             
+            # Indexes for the non-key lookups. The UNIQUE constraints on subscriptions
+            # and portal_banned_users already index telegram_id and (portal_id, user_id).
+            await cursor.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_portals_public_channel
+                    ON portals(public_channel_id) WHERE is_active = 1;
+                CREATE INDEX IF NOT EXISTS idx_portals_private_group
+                    ON portals(private_group_id) WHERE is_active = 1;
+                CREATE INDEX IF NOT EXISTS idx_portals_owner ON portals(owner_id);
+                CREATE INDEX IF NOT EXISTS idx_verif_portal_status ON portal_verifications(portal_id, status);
+                CREATE INDEX IF NOT EXISTS idx_alert_history_tid ON alert_history(telegram_id, created_at);
+            """)
+            
+            # One verification row per (portal, user), so verify_user can upsert.
+            # Older databases may hold duplicates; keep the newest row of each.
+            await cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_verif_portal_user'"
+            )
+            if not await cursor.fetchone():
+                await cursor.execute("""
+                    DELETE FROM portal_verifications WHERE id NOT IN (
+                        SELECT MAX(id) FROM portal_verifications GROUP BY portal_id, user_id
+                    )
+                """)
+                await cursor.executescript("""
+                    DROP INDEX IF EXISTS idx_verif_portal_user;
+                    CREATE UNIQUE INDEX uq_verif_portal_user ON portal_verifications(portal_id, user_id);
+                """)
+            
+            # Databases created before the portal counters existed get the columns
+            # added and filled in once; the triggers keep them current from then on
+            added = [
+                await self._ensure_column(cursor, "portals", column, "INTEGER DEFAULT 0")
+                for column in ("verified_count", "pending_count", "banned_count")
+            ]
+            if any(added):
+                await cursor.execute(_BACKFILL_PORTAL_COUNTS_SQL)
+            await cursor.executescript(_PORTAL_COUNT_TRIGGERS)
+            
             await self._connection.commit()
     
+    @staticmethod
+    async def _ensure_column(cursor, table: str, column: str, declaration: str) -> bool:
+        """Add a column to an existing table if it is missing; True if added"""
+        await cursor.execute(f"PRAGMA table_info({table})")
+        if any(row[1] == column for row in await cursor.fetchall()):
+            return False
+        await cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        return True
+    
     async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user by Telegram ID"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,))
+        async with self._connection.execute(_GET_USER_SQL, (telegram_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-        return None
+        return dict(row) if row else None
     
     async def create_or_update_user(self, telegram_id: int, username: str = None, mogra_chat_id: str = None) -> bool:
         """Create or update a user"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO users (telegram_id, username, mogra_chat_id)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(telegram_id) DO UPDATE SET
-                        username = COALESCE(excluded.username, users.username),
-                        mogra_chat_id = COALESCE(excluded.mogra_chat_id, users.mogra_chat_id),
-                        updated_at = CURRENT_TIMESTAMP
-                """, (telegram_id, username, mogra_chat_id))
-                await self._connection.commit()
+            params = (telegram_id, username, mogra_chat_id)
+            if username is None and mogra_chat_id is None:
+                await self._enqueue_write(_INSERT_USER_SQL, params)
+            else:
+                async def write(cursor):
+                    await cursor.execute(_INSERT_USER_SQL, params)
+                    await cursor.execute(_UPDATE_USER_SQL, params)
+                await self._run_write(write)
+            self._invalidate_subscriptions()
             return True
         except Exception as e:
             logger.error(f"Error creating/updating user: {e}")
             return False
     
+    async def create_or_update_users(self, rows: List[Tuple[int, str, str]]) -> bool:
+        """Create or update many users in one transaction
+
+        Each row is (telegram_id, username, mogra_chat_id)
+        """
+        if not rows:
+            return True
+        try:
+            async def write(cursor):
+                await cursor.executemany(_INSERT_USER_SQL, rows)
+                await cursor.executemany(_UPDATE_USER_SQL, rows)
+            await self._run_write(write)
+            self._invalidate_subscriptions()
+            return True
+        except Exception as e:
+            logger.error(f"Error creating/updating users: {e}")
+            return False
+    
+    async def upsert_and_fetch_user(self, telegram_id: int, username: str = None,
+                                    mogra_chat_id: str = None) -> Optional[Dict[str, Any]]:
+        """Create or update a user and return the resulting row"""
+        params = (telegram_id, username, mogra_chat_id)
+        async def write(cursor):
+            if _HAS_RETURNING:
+                await cursor.execute(_UPSERT_USER_RETURNING_SQL, params)
+            else:
+                await cursor.execute(_UPSERT_USER_SQL, params)
+                await cursor.execute(_GET_USER_SQL, (telegram_id,))
+            return await cursor.fetchone()
+        try:
+            row = await self._run_write(write)
+            self._invalidate_subscriptions()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error upserting user: {e}")
+            return None
+    
     async def update_user_settings(self, telegram_id: int, alerts_enabled: bool = None,
                                     min_volume_usd: float = None, min_liquidity_usd: float = None,
                                     price_change_threshold: float = None) -> bool:
@@ -205,103 +736,165 @@ class DatabaseManager:
                 updates.append("updated_at = CURRENT_TIMESTAMP")
                 params.append(telegram_id)
                 
-                async with self._connection.cursor() as cursor:
-                    await cursor.execute(
-                        f"UPDATE users SET {', '.join(updates)} WHERE telegram_id = ?",
-                        params
-                    )
-                    await self._connection.commit()
+                await self._enqueue_write(
+                    f"UPDATE users SET {', '.join(updates)} WHERE telegram_id = ?",
+                    params
+                )
+                self._invalidate_subscriptions()
             return True
         except Exception as e:
             logger.error(f"Error updating user settings: {e}")
             return False
     
+    async def toggle_user_alerts(self, telegram_id: int) -> Optional[bool]:
+        """Flip a user's alerts_enabled in one statement
+        
+        Returns the new value, or None if the user doesn't exist or the update failed.
+        """
+        sql = """
+            UPDATE users SET alerts_enabled = NOT alerts_enabled, updated_at = CURRENT_TIMESTAMP
+            WHERE telegram_id = ?
+        """
+        params = (telegram_id,)
+        
+        async def write(cursor):
+            if _HAS_RETURNING:
+                await cursor.execute(sql + " RETURNING alerts_enabled", params)
+                return await cursor.fetchone()
+            await cursor.execute(sql, params)
+            if not cursor.rowcount:
+                return None
+            await cursor.execute("SELECT alerts_enabled FROM users WHERE telegram_id = ?", params)
+            return await cursor.fetchone()
+        try:
+            row = await self._run_write(write)
+            self._invalidate_subscriptions()
+            return bool(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error toggling user alerts: {e}")
+            return None
+    
     async def add_subscription(self, telegram_id: int, chat_id: int, subscription_type: str = "all") -> bool:
         """Add a subscription for alerts"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT OR IGNORE INTO subscriptions (telegram_id, chat_id, subscription_type)
-                    VALUES (?, ?, ?)
-                """, (telegram_id, chat_id, subscription_type))
-                await self._connection.commit()
+            await self._enqueue_write(_ADD_SUBSCRIPTION_SQL, (telegram_id, chat_id, subscription_type))
+            self._invalidate_subscriptions()
             return True
         except Exception as e:
             logger.error(f"Error adding subscription: {e}")
             return False
     
+    async def add_subscriptions(self, rows: List[Tuple[int, int, str]]) -> bool:
+        """Add many subscriptions in one transaction
+
+        Each row is (telegram_id, chat_id, subscription_type)
+        """
+        if not rows:
+            return True
+        try:
+            await self._run_write(_statements(_ADD_SUBSCRIPTION_SQL, rows))
+            self._invalidate_subscriptions()
+            return True
+        except Exception as e:
+            logger.error(f"Error adding subscriptions: {e}")
+            return False
+    
     async def remove_subscription(self, telegram_id: int, chat_id: int) -> bool:
         """Remove a subscription"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute(
-                    "DELETE FROM subscriptions WHERE telegram_id = ? AND chat_id = ?",
-                    (telegram_id, chat_id)
-                )
-                await self._connection.commit()
+            await self._enqueue_write(
+                "DELETE FROM subscriptions WHERE telegram_id = ? AND chat_id = ?",
+                (telegram_id, chat_id)
+            )
+            self._invalidate_subscriptions()
             return True
         except Exception as e:
             logger.error(f"Error removing subscription: {e}")
             return False
     
+    def _invalidate_subscriptions(self):
+        """Drop the cached get_all_subscriptions result after a write"""
+        self._subs_cache = None
+    
     async def get_all_subscriptions(self) -> List[Dict[str, Any]]:
-        """Get all active subscriptions"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("""
+        """Get all active subscriptions
+        
+        The list is cached and shared between callers, who must not modify it.
+        """
+        now = time.monotonic()
+        if self._subs_cache is not None and now < self._subs_cache_expires:
+            return self._subs_cache
+        async with self._connection.execute("""
                 SELECT s.*, u.alerts_enabled, u.min_volume_usd, u.min_liquidity_usd, u.price_change_threshold
                 FROM subscriptions s
                 JOIN users u ON s.telegram_id = u.telegram_id
                 WHERE u.alerts_enabled = 1
-            """)
+            """) as cursor:
             rows = await cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+        self._subs_cache = [dict(row) for row in rows]
+        self._subs_cache_expires = now + _SUBSCRIPTIONS_CACHE_TTL
+        return self._subs_cache
+    
+    async def _load_seen_pairs(self) -> Set[str]:
+        """Load seen_tokens into memory once; mark_token_seen keeps it current"""
+        if self._seen_pairs is None:
+            seen: Set[str] = set()
+            # seen_tokens only grows; read it in chunks so the whole table never
+            # sits in one list of Row objects next to the set being built
+            async with self._connection.execute("SELECT pair_address FROM seen_tokens") as cursor:
+                while rows := await cursor.fetchmany(_FETCH_CHUNK_SIZE):
+                    seen.update(row[0] for row in rows)
+            self._seen_pairs = seen
+        return self._seen_pairs
     
     async def is_token_seen(self, pair_address: str) -> bool:
         """Check if a token pair has been seen before"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT 1 FROM seen_tokens WHERE pair_address = ?", (pair_address,))
-            return await cursor.fetchone() is not None
+        return pair_address in await self._load_seen_pairs()
     
     async def mark_token_seen(self, pair_address: str, token_symbol: str, token_name: str) -> bool:
         """Mark a token as seen"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO seen_tokens (pair_address, token_symbol, token_name, last_alert_at, alert_count)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, 1)
-                    ON CONFLICT(pair_address) DO UPDATE SET
-                        last_alert_at = CURRENT_TIMESTAMP,
-                        alert_count = seen_tokens.alert_count + 1
-                """, (pair_address, token_symbol, token_name))
-                await self._connection.commit()
+            await self._enqueue_write(_MARK_SEEN_SQL, (pair_address, token_symbol, token_name))
+            if self._seen_pairs is not None:
+                self._seen_pairs.add(pair_address)
             return True
         except Exception as e:
             logger.error(f"Error marking token as seen: {e}")
             return False
     
     async def get_seen_pair_addresses(self) -> Set[str]:
-        """Get all seen pair addresses"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT pair_address FROM seen_tokens")
-            rows = await cursor.fetchall()
-            return {row[0] for row in rows}
+        """Get all seen pair addresses (a copy; callers may modify it)"""
+        return set(await self._load_seen_pairs())
     
     async def log_alert(self, telegram_id: int, chat_id: int, pair_address: str, 
                         alert_type: str, message: str) -> bool:
-        """Log an alert that was sent"""
-        try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO alert_history (telegram_id, chat_id, pair_address, alert_type, message)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (telegram_id, chat_id, pair_address, alert_type, message))
-                await self._connection.commit()
+        """Log an alert that was sent
+        
+        Only queues the row; the batch writer commits it shortly after, so a
+        crash can lose the last few milliseconds of history.
+        """
+        return self._queue_alert_rows(_statement(_LOG_ALERT_SQL, (telegram_id, chat_id, pair_address, alert_type, message)), False)
+
+    async def log_alerts_bulk(self, rows: List[Tuple[int, int, str, str, str]]) -> bool:
+        """Log many sent alerts in one statement, queued like log_alert
+
+        Each row is (telegram_id, chat_id, pair_address, alert_type, message)
+        """
+        if not rows:
             return True
-        except Exception as e:
-            logger.error(f"Error logging alert: {e}")
+        return self._queue_alert_rows(_statements(_LOG_ALERT_SQL, rows), True)
+
+    def _queue_alert_rows(self, job: Callable[[aiosqlite.Cursor], Awaitable[None]], isolated: bool) -> bool:
+        """Hand alert history to the batch writer without waiting for its commit"""
+        if self._writer_task is None or self._writer_task.done():
+            logger.warning("Database writer not running, dropping alert history")
             return False
-    
+        if self._write_queue.qsize() >= _ALERT_BACKLOG_LIMIT:
+            logger.warning("Write backlog full, dropping alert history")
+            return False
+        self._write_queue.put_nowait((job, None, isolated))
+        return True
+
     # ==================== PORTAL METHODS ====================
     
     async def create_portal(self, portal_id: str, owner_id: int, public_channel_id: int,
@@ -309,63 +902,47 @@ class DatabaseManager:
                            private_group_title: str, welcome_message: str = None) -> bool:
         """Create a new portal"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO portals (portal_id, owner_id, public_channel_id, public_channel_username,
-                                        private_group_id, private_group_title, welcome_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(portal_id) DO UPDATE SET
-                        public_channel_id = excluded.public_channel_id,
-                        public_channel_username = excluded.public_channel_username,
-                        private_group_id = excluded.private_group_id,
-                        private_group_title = excluded.private_group_title,
-                        welcome_message = excluded.welcome_message,
-                        updated_at = CURRENT_TIMESTAMP
-                """, (portal_id, owner_id, public_channel_id, public_channel_username,
-                      private_group_id, private_group_title, welcome_message))
-                await self._connection.commit()
+            await self._enqueue_write("""
+                INSERT INTO portals (portal_id, owner_id, public_channel_id, public_channel_username,
+                                    private_group_id, private_group_title, welcome_message)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(portal_id) DO UPDATE SET
+                    public_channel_id = excluded.public_channel_id,
+                    public_channel_username = excluded.public_channel_username,
+                    private_group_id = excluded.private_group_id,
+                    private_group_title = excluded.private_group_title,
+                    welcome_message = excluded.welcome_message,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (portal_id, owner_id, public_channel_id, public_channel_username,
+                  private_group_id, private_group_title, welcome_message))
             return True
         except Exception as e:
             logger.error(f"Error creating portal: {e}")
             return False
     
-    async def get_portal(self, portal_id: str) -> Optional[Dict[str, Any]]:
+    async def get_portal(self, portal_id: str) -> Optional[Portal]:
         """Get portal by ID"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM portals WHERE portal_id = ?", (portal_id,))
+        async with self._connection.execute(_GET_PORTAL_SQL, (portal_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-        return None
+        return Portal(*row) if row else None
     
-    async def get_portal_by_channel(self, channel_id: int) -> Optional[Dict[str, Any]]:
+    async def get_portal_by_channel(self, channel_id: int) -> Optional[Portal]:
         """Get portal by public channel ID"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM portals WHERE public_channel_id = ? AND is_active = 1", (channel_id,))
+        async with self._connection.execute(_GET_PORTAL_BY_CHANNEL_SQL, (channel_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-        return None
+        return Portal(*row) if row else None
     
-    async def get_portal_by_private_group(self, group_id: int) -> Optional[Dict[str, Any]]:
+    async def get_portal_by_private_group(self, group_id: int) -> Optional[Portal]:
         """Get portal by private group ID"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM portals WHERE private_group_id = ? AND is_active = 1", (group_id,))
+        async with self._connection.execute(_GET_PORTAL_BY_GROUP_SQL, (group_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-        return None
+        return Portal(*row) if row else None
     
-    async def get_user_portals(self, owner_id: int) -> List[Dict[str, Any]]:
+    async def get_user_portals(self, owner_id: int) -> List[Portal]:
         """Get all portals owned by a user"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM portals WHERE owner_id = ?", (owner_id,))
+        async with self._connection.execute(f"SELECT {_PORTAL_COLS} FROM portals WHERE owner_id = ?", (owner_id,)) as cursor:
             rows = await cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return [Portal(*row) for row in rows]
     
     async def update_portal_settings(self, portal_id: str, **kwargs) -> bool:
         """Update portal settings"""
@@ -384,25 +961,57 @@ class DatabaseManager:
                 updates.append("updated_at = CURRENT_TIMESTAMP")
                 params.append(portal_id)
                 
-                async with self._connection.cursor() as cursor:
-                    await cursor.execute(
-                        f"UPDATE portals SET {', '.join(updates)} WHERE portal_id = ?",
-                        params
-                    )
-                    await self._connection.commit()
+                await self._enqueue_write(
+                    f"UPDATE portals SET {', '.join(updates)} WHERE portal_id = ?",
+                    params
+                )
             return True
         except Exception as e:
             logger.error(f"Error updating portal: {e}")
             return False
     
+    async def toggle_portal_setting(self, portal_id: str, owner_id: int, field: str) -> Optional[bool]:
+        """Flip a boolean portal setting owned by owner_id in one statement
+        
+        Returns the new value, or None if the portal doesn't exist, isn't owned
+        by owner_id, or the update failed.
+        """
+        if field not in ('is_active', 'require_username', 'require_profile_photo', 'captcha_enabled'):
+            raise ValueError(f"Not a toggleable portal setting: {field}")
+        
+        sql = f"""
+            UPDATE portals SET {field} = NOT {field}, updated_at = CURRENT_TIMESTAMP
+            WHERE portal_id = ? AND owner_id = ?
+        """
+        params = (portal_id, owner_id)
+        
+        async def write(cursor):
+            if _HAS_RETURNING:
+                await cursor.execute(sql + f" RETURNING {field}", params)
+                return await cursor.fetchone()
+            await cursor.execute(sql, params)
+            if not cursor.rowcount:
+                return None
+            await cursor.execute(f"SELECT {field} FROM portals WHERE portal_id = ?", (portal_id,))
+            return await cursor.fetchone()
+        try:
+            row = await self._run_write(write)
+            return bool(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error toggling portal setting: {e}")
+            return None
+    
     async def delete_portal(self, portal_id: str) -> bool:
-        """Delete a portal"""
+        """Delete a portal with its verifications and bans in one transaction"""
+        async def write(cursor):
+            await cursor.execute("DELETE FROM portal_verifications WHERE portal_id = ?", (portal_id,))
+            await cursor.execute("DELETE FROM portal_banned_users WHERE portal_id = ?", (portal_id,))
+            await cursor.execute("DELETE FROM portals WHERE portal_id = ?", (portal_id,))
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("DELETE FROM portal_verifications WHERE portal_id = ?", (portal_id,))
-                await cursor.execute("DELETE FROM portal_banned_users WHERE portal_id = ?", (portal_id,))
-                await cursor.execute("DELETE FROM portals WHERE portal_id = ?", (portal_id,))
-                await self._connection.commit()
+            # One writer job: its savepoint drops every delete if any of them fails
+            await self._run_write(write)
+            if self._banned is not None:
+                self._banned = {ban for ban in self._banned if ban[0] != portal_id}
             return True
         except Exception as e:
             logger.error(f"Error deleting portal: {e}")
@@ -411,84 +1020,133 @@ class DatabaseManager:
     async def create_verification(self, portal_id: str, user_id: int, username: str = None) -> bool:
         """Create a verification record"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO portal_verifications (portal_id, user_id, username, status)
-                    VALUES (?, ?, ?, 'pending')
-                    ON CONFLICT DO NOTHING
-                """, (portal_id, user_id, username))
-                await self._connection.commit()
+            await self._enqueue_write(_CREATE_VERIFICATION_SQL, (portal_id, user_id, username))
             return True
         except Exception as e:
             logger.error(f"Error creating verification: {e}")
             return False
     
+    async def create_verifications(self, rows: List[Tuple[str, int, Optional[str]]]) -> bool:
+        """Create many pending verification records in one statement
+
+        Each row is (portal_id, user_id, username)
+        """
+        if not rows:
+            return True
+        try:
+            await self._run_write(_statements(_CREATE_VERIFICATION_SQL, rows))
+            return True
+        except Exception as e:
+            logger.error(f"Error creating verifications: {e}")
+            return False
+    
+    async def upsert_verification(self, portal_id: str, user_id: int, username: str, status: str,
+                                  invite_link: str = None, invite_expires_at: str = None) -> bool:
+        """Create or update a verification record with its final status in one write"""
+        try:
+            await self._enqueue_write(
+                _UPSERT_VERIFICATION_SQL,
+                (portal_id, user_id, username, status, invite_link, invite_expires_at)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting verification: {e}")
+            return False
+    
+    async def upsert_verifications(self, rows: List[Tuple[str, int, Optional[str], str, Optional[str], Optional[str]]]) -> bool:
+        """Create or update many verification records in one statement
+
+        Each row is (portal_id, user_id, username, status, invite_link, invite_expires_at)
+        """
+        if not rows:
+            return True
+        try:
+            await self._run_write(_statements(_UPSERT_VERIFICATION_SQL, rows))
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting verifications: {e}")
+            return False
+    
     async def update_verification(self, portal_id: str, user_id: int, status: str,
                                   invite_link: str = None, invite_expires_at: str = None) -> bool:
         """Update verification status"""
         try:
-            async with self._connection.cursor() as cursor:
-                if status == 'verified':
-                    await cursor.execute("""
-                        UPDATE portal_verifications 
-                        SET status = ?, verified_at = CURRENT_TIMESTAMP, invite_link = ?, invite_expires_at = ?
-                        WHERE portal_id = ? AND user_id = ?
-                    """, (status, invite_link, invite_expires_at, portal_id, user_id))
-                else:
-                    await cursor.execute("""
-                        UPDATE portal_verifications SET status = ? WHERE portal_id = ? AND user_id = ?
-                    """, (status, portal_id, user_id))
-                await self._connection.commit()
+            # Batched with other writes: join bursts mark many users at once
+            if status == 'verified':
+                await self._enqueue_write("""
+                    UPDATE portal_verifications 
+                    SET status = ?, verified_at = CURRENT_TIMESTAMP, invite_link = ?, invite_expires_at = ?
+                    WHERE portal_id = ? AND user_id = ?
+                """, (status, invite_link, invite_expires_at, portal_id, user_id))
+            else:
+                await self._enqueue_write("""
+                    UPDATE portal_verifications SET status = ? WHERE portal_id = ? AND user_id = ?
+                """, (status, portal_id, user_id))
             return True
         except Exception as e:
             logger.error(f"Error updating verification: {e}")
             return False
     
-    async def get_verification(self, portal_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    async def get_verification(self, portal_id: str, user_id: int) -> Optional[VerificationRecord]:
         """Get verification record"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "SELECT * FROM portal_verifications WHERE portal_id = ? AND user_id = ?",
-                (portal_id, user_id)
-            )
+        async with self._connection.execute(_GET_VERIFICATION_SQL, (portal_id, user_id)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-        return None
+        return VerificationRecord(*row) if row else None
+    
+    async def _load_bans(self) -> Set[Tuple[str, int]]:
+        """Load portal bans into memory once; the ban methods keep it current
+        
+        Nearly every verification is by a user who isn't banned, so the check
+        is a set lookup instead of a query.
+        """
+        if self._banned is None:
+            banned: Set[Tuple[str, int]] = set()
+            async with self._connection.execute("SELECT portal_id, user_id FROM portal_banned_users") as cursor:
+                while rows := await cursor.fetchmany(_FETCH_CHUNK_SIZE):
+                    banned.update((row[0], row[1]) for row in rows)
+            self._banned = banned
+        return self._banned
     
     async def is_user_banned(self, portal_id: str, user_id: int) -> bool:
         """Check if user is banned from portal"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "SELECT 1 FROM portal_banned_users WHERE portal_id = ? AND user_id = ?",
-                (portal_id, user_id)
-            )
-            return await cursor.fetchone() is not None
+        return (portal_id, user_id) in await self._load_bans()
     
     async def ban_user(self, portal_id: str, user_id: int, reason: str, banned_by: int) -> bool:
         """Ban a user from portal"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT OR REPLACE INTO portal_banned_users (portal_id, user_id, reason, banned_by)
-                    VALUES (?, ?, ?, ?)
-                """, (portal_id, user_id, reason, banned_by))
-                await self._connection.commit()
+            await self._enqueue_write(_BAN_USER_SQL, (portal_id, user_id, reason, banned_by))
+            if self._banned is not None:
+                self._banned.add((portal_id, user_id))
             return True
         except Exception as e:
             logger.error(f"Error banning user: {e}")
             return False
     
+    async def ban_users(self, rows: List[Tuple[str, int, str, int]]) -> bool:
+        """Ban many users in one transaction
+
+        Each row is (portal_id, user_id, reason, banned_by)
+        """
+        if not rows:
+            return True
+        try:
+            await self._run_write(_statements(_BAN_USER_SQL, rows))
+            if self._banned is not None:
+                self._banned.update((portal_id, user_id) for portal_id, user_id, _, _ in rows)
+            return True
+        except Exception as e:
+            logger.error(f"Error banning users: {e}")
+            return False
+    
     async def unban_user(self, portal_id: str, user_id: int) -> bool:
         """Unban a user from portal"""
         try:
-            async with self._connection.cursor() as cursor:
-                await cursor.execute(
-                    "DELETE FROM portal_banned_users WHERE portal_id = ? AND user_id = ?",
-                    (portal_id, user_id)
-                )
-                await self._connection.commit()
+            await self._enqueue_write(
+                "DELETE FROM portal_banned_users WHERE portal_id = ? AND user_id = ?",
+                (portal_id, user_id)
+            )
+            if self._banned is not None:
+                self._banned.discard((portal_id, user_id))
             return True
         except Exception as e:
             logger.error(f"Error unbanning user: {e}")
@@ -496,26 +1154,10 @@ class DatabaseManager:
     
     async def get_portal_stats(self, portal_id: str) -> Dict[str, int]:
         """Get portal statistics"""
-        async with self._connection.cursor() as cursor:
-            await cursor.execute(
-                "SELECT COUNT(*) FROM portal_verifications WHERE portal_id = ? AND status = 'verified'",
-                (portal_id,)
-            )
-            verified = (await cursor.fetchone())[0]
-            
-            await cursor.execute(
-                "SELECT COUNT(*) FROM portal_verifications WHERE portal_id = ? AND status = 'pending'",
-                (portal_id,)
-            )
-            pending = (await cursor.fetchone())[0]
-            
-            await cursor.execute(
-                "SELECT COUNT(*) FROM portal_banned_users WHERE portal_id = ?",
-                (portal_id,)
-            )
-            banned = (await cursor.fetchone())[0]
-            
-            return {"verified": verified, "pending": pending, "banned": banned}
+        async with self._connection.execute(_GET_PORTAL_STATS_SQL, (portal_id,)) as cursor:
+            row = await cursor.fetchone()
+        verified, pending, banned = row if row else (0, 0, 0)
+        return {"verified": verified, "pending": pending, "banned": banned}
 
 
 db = DatabaseManager()
@@ -0,0 +1,25 @@
+"""
+JSON Utilities
+Fast JSON encode/decode, using orjson when it is installed
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; fall back to the stdlib
+    orjson = None
+
+
+if orjson:
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a JSON string"""
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a JSON string"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    loads = json.loads
@@ -4,32 +4,147 @@ Handles portal verification similar to Safeguard Bot
 Creates portal from public channel to verify users entering private group
 """
 import asyncio
+import html
+import re
 import secrets
 import string
-from typing import Optional, Dict, Any, List
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Set, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
 
-from telegram import Bot, ChatPermissions
+from telegram import Bot, ChatInviteLink, ChatPermissions
 from telegram.error import TelegramError
 
+from cache import TTLCache
 from config import config
-from database import DatabaseManager
+from database import DatabaseManager, Portal
+from templates import PORTAL_WELCOME_TEMPLATE, PORTAL_POST_TEMPLATE, PORTAL_SETUP_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
+# Portal rows are read on every verification click but rarely change; writers
+# call invalidate_portal so owners see their own changes immediately
+PORTAL_CACHE_TTL = 30
+
+# Invite links are minted ahead of time per private group so a verification
+# click doesn't wait on create_chat_invite_link. Pooled links get
+# INVITE_POOL_MAX_AGE seconds of extra lifetime and are only handed out while
+# younger than that, so users still get at least the advertised expiry.
+# While a group gets clicks less than INVITE_POOL_MAX_AGE apart, each click
+# mints one replacement link, so pooling costs the same one create per click
+# as minting directly; quiet groups skip the pool and stale links are revoked.
+# Pooled links are named "Portal" rather than per user (renaming one on take
+# would be another API call); portal_verifications records which user got it.
+INVITE_POOL_SIZE = 3
+INVITE_POOL_MAX_AGE = 300
+
+# Invite lifetimes, built once rather than on every link
+_INVITE_LIFETIME = timedelta(minutes=config.PORTAL_INVITE_EXPIRY_MINUTES)
+_POOLED_INVITE_LIFETIME = _INVITE_LIFETIME + timedelta(seconds=INVITE_POOL_MAX_AGE)
+
+# Users who passed the username/photo checks skip the Telegram calls on repeat
+# clicks for this long. Failures aren't cached, so a user who just fixed their
+# profile is re-checked straight away.
+USER_CHECK_CACHE_TTL = 60
+
+# Verification clicks arriving within this many seconds of each other are
+# verified as one batch (see verify_users_batch)
+VERIFY_BATCH_WINDOW = 0.005
+
+# Seconds between the ban and unban that make up a kick
+KICK_UNBAN_DELAY = 1
+
+PORTAL_ID_LENGTH = 8
+
+_PORTAL_ID_ALPHABET = (string.ascii_lowercase + string.digits).encode()
+# Bytes at or above the largest multiple of the alphabet size are rejected, so
+# every character is equally likely
+_PORTAL_ID_BYTE_LIMIT = 256 - 256 % len(_PORTAL_ID_ALPHABET)
+# Portal IDs come from callback data and deep links, so anything that isn't
+# shaped like a generated ID is turned away before it reaches the cache or DB
+_PORTAL_ID_RE = re.compile(f"[a-z0-9]{{{PORTAL_ID_LENGTH}}}")
+
 
 class PortalService:
     """Service for managing verification portals"""
     
+    __slots__ = (
+        "bot", "db", "_portal_cache", "_invite_pools", "_invite_refills", "_last_invite_take",
+        "_pending_tasks", "_has_username", "_has_photo", "_pending_verifications", "_verify_flush"
+    )
+    
     def __init__(self, bot: Bot, db: DatabaseManager):
         self.bot = bot
         self.db = db
+        self._portal_cache = TTLCache(maxsize=1024, ttl=PORTAL_CACHE_TTL)
+        self._invite_pools: Dict[int, deque] = {}
+        self._invite_refills: Dict[int, Set[asyncio.Task]] = {}  # Pooled links being minted
+        self._last_invite_take: Dict[int, float] = {}
+        self._pending_tasks: Set[asyncio.Task] = set()  # Unbans and revocations; strong refs until each finishes
+        self._has_username = TTLCache(maxsize=10_000, ttl=USER_CHECK_CACHE_TTL)
+        self._has_photo = TTLCache(maxsize=10_000, ttl=USER_CHECK_CACHE_TTL)
+        self._pending_verifications: List[Tuple[Tuple[str, int, Optional[str]], asyncio.Future]] = []
+        self._verify_flush: Optional[asyncio.TimerHandle] = None
     
-    def generate_portal_id(self, length: int = 8) -> str:
+    async def _get_portal_cached(self, portal_id: str) -> Optional[Portal]:
+        """Get a portal, from cache if fetched recently"""
+        if not is_valid_portal_id(portal_id):
+            return None
+        portal = self._portal_cache.get(portal_id)
+        if portal is None:
+            portal = await self.db.get_portal(portal_id)
+            if portal:
+                self._portal_cache[portal_id] = portal
+        return portal
+    
+    def invalidate_portal(self, portal_id: str):
+        """Drop a cached portal after its row was changed or deleted"""
+        self._portal_cache.pop(portal_id)
+    
+    async def drop_invite_pool(self, group_id: int):
+        """Stop refilling a group's invite pool and revoke the links in it"""
+        refills = self._invite_refills.pop(group_id, set())
+        for task in refills:
+            task.cancel()
+        await asyncio.gather(*refills, return_exceptions=True)
+        self._last_invite_take.pop(group_id, None)
+        pool = self._invite_pools.pop(group_id, None)
+        if pool:
+            await asyncio.gather(*(self._revoke_invite_link(group_id, link) for _, link, _ in pool))
+    
+    async def close(self):
+        """Finish queued verifications, drop every invite pool and wait for pending tasks"""
+        if self._verify_flush:
+            self._verify_flush.cancel()
+            self._flush_verifications()
+        await asyncio.gather(*map(self.drop_invite_pool, list(self._invite_pools)))
+        await asyncio.gather(*self._pending_tasks, return_exceptions=True)
+    
+    def _spawn(self, coro):
+        """Run `coro` in the background, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+    
+    def invalidate_user(self, user_id: int):
+        """Forget a user's passed requirement checks so the next click re-checks"""
+        self._has_username.pop(user_id)
+        self._has_photo.pop(user_id)
+    
+    def generate_portal_id(self, length: int = PORTAL_ID_LENGTH) -> str:
         """Generate a unique portal ID"""
-        chars = string.ascii_lowercase + string.digits
-        return ''.join(secrets.choice(chars) for _ in range(length))
+        portal_id = bytearray()
+        while len(portal_id) < length:
+            # One entropy read per round; ~2% of bytes are rejected to avoid bias
+            portal_id.extend(
+                _PORTAL_ID_ALPHABET[b % len(_PORTAL_ID_ALPHABET)]
+                for b in secrets.token_bytes(length)
+                if b < _PORTAL_ID_BYTE_LIMIT
+            )
+        return portal_id[:length].decode()
     
     async def create_portal(
         self,
@@ -57,13 +172,7 @@ class PortalService:
         portal_id = self.generate_portal_id()
         
         if not welcome_message:
-            welcome_message = f"""
-🔐 *Portal Verification*
-
-Welcome! To join *{private_group_title}*, you need to verify yourself.
-
-Click the button below to start verification.
-            """
+            welcome_message = PORTAL_WELCOME_TEMPLATE.format(group_title=_group_label(private_group_title))
         
         success = await self.db.create_portal(
             portal_id=portal_id,
@@ -76,7 +185,7 @@ Click the button below to start verification.
         )
         
         if success:
-            logger.info(f"Portal created: {portal_id} by user {owner_id}")
+            logger.info("Portal created: %s by user %s", portal_id, owner_id)
             return portal_id
         return None
     
@@ -89,78 +198,199 @@ Click the button below to start verification.
         """
         Verify a user and generate invite link
         
+        Clicks arriving together are verified as one batch by verify_users_batch.
+        
         Returns:
             Dict with 'success', 'invite_link', 'message', 'expires_at'
         """
-        # Get portal info
-        portal = await self.db.get_portal(portal_id)
-        if not portal:
-            return {"success": False, "message": "Portal not found"}
+        future = asyncio.get_running_loop().create_future()
+        self._pending_verifications.append(((portal_id, user_id, username), future))
+        if self._verify_flush is None:
+            self._verify_flush = asyncio.get_running_loop().call_later(VERIFY_BATCH_WINDOW, self._flush_verifications)
+        return await future
+    
+    def _flush_verifications(self):
+        """Start verifying the clicks collected so far"""
+        self._verify_flush = None
+        pending, self._pending_verifications = self._pending_verifications, []
+        if pending:
+            self._spawn(self._run_verifications(pending))
+    
+    async def _run_verifications(self, pending: List[Tuple[Tuple[str, int, Optional[str]], asyncio.Future]]):
+        """Run a batch of clicks and hand each waiting verify_user its result"""
+        try:
+            results = await self.verify_users_batch([request for request, _ in pending])
+        except BaseException as e:
+            for _, future in pending:
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return  # Already handed to every caller
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue  # Caller gave up
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def verify_users_batch(self, requests: List[Tuple[str, int, Optional[str]]]) -> List[Any]:
+        """
+        Verify many (portal_id, user_id, username) clicks at once
         
-        if not portal.get("is_active"):
-            return {"success": False, "message": "Portal is inactive"}
+        Each distinct portal is fetched once, the requirement checks and invite
+        links for every click run concurrently, and the outcomes are written with
+        one statement per portal.
         
-        # Check if user is banned
-        if await self.db.is_user_banned(portal_id, user_id):
-            return {"success": False, "message": "You are banned from this portal"}
+        Returns one verify_user result per request, in order, or the exception
+        for a click that failed unexpectedly.
+        """
+        portal_ids = list(dict.fromkeys(portal_id for portal_id, _, _ in requests))
+        portals = dict(zip(portal_ids, await asyncio.gather(*map(self._get_portal_cached, portal_ids))))
+        banned = await asyncio.gather(*(
+            self.db.is_user_banned(portal_id, user_id) for portal_id, user_id, _ in requests
+        ))
+        results: List[Any] = [None] * len(requests)
+        
+        eligible = []
+        for i, ((portal_id, _, _), is_banned) in enumerate(zip(requests, banned)):
+            portal = portals[portal_id]
+            if not portal:
+                results[i] = {"success": False, "message": "Portal not found"}
+            elif not portal.is_active:
+                results[i] = {"success": False, "message": "Portal is inactive"}
+            elif is_banned:
+                results[i] = {"success": False, "message": "You are banned from this portal"}
+            else:
+                eligible.append(i)
         
         # Check verification requirements
-        verification_result = await self._check_requirements(portal, user_id)
-        if not verification_result["passed"]:
-            return {"success": False, "message": verification_result["message"]}
+        checks = await asyncio.gather(*(
+            self._check_requirements(portals[requests[i][0]], requests[i][1]) for i in eligible
+        ), return_exceptions=True)
+        passed = []
+        for i, check in zip(eligible, checks):
+            if isinstance(check, BaseException):
+                results[i] = check
+            elif not check["passed"]:
+                results[i] = {"success": False, "message": check["message"]}
+            else:
+                passed.append(i)
+        
+        # Get invite links, pre-minted where the pool has fresh ones
+        links = await asyncio.gather(*(
+            self._take_invite_link(portals[requests[i][0]].private_group_id, requests[i][1]) for i in passed
+        ), return_exceptions=True)
+        verified: Dict[str, List[tuple]] = {}
+        failed = []
+        for i, link in zip(passed, links):
+            portal_id, user_id, username = requests[i]
+            if isinstance(link, TelegramError):
+                logger.error("Error creating invite link: %s", link)
+                failed.append((portal_id, user_id, username))
+                results[i] = {"success": False, "message": f"Error creating invite link: {str(link)}"}
+            elif isinstance(link, BaseException):
+                results[i] = link
+            else:
+                invite_link, expire_date = link
+                verified.setdefault(portal_id, []).append(
+                    (portal_id, user_id, username, "verified", invite_link.invite_link, expire_date.isoformat())
+                )
+                logger.info("User %s verified for portal %s", user_id, portal_id)
+                results[i] = {
+                    "success": True,
+                    "invite_link": invite_link.invite_link,
+                    "message": "Verification successful!",
+                    "expires_at": expire_date,
+                    "group_title": portals[portal_id].private_group_title
+                }
+        
+        # One statement per portal, so a portal deleted meanwhile only fails its own rows.
+        # Failed attempts leave existing records alone and otherwise note them as pending
+        await asyncio.gather(
+            *map(self.db.upsert_verifications, verified.values()),
+            self.db.create_verifications(failed)
+        )
+        return results
+    
+    async def _create_invite_link(self, group_id: int, name: str, lifetime: timedelta = _INVITE_LIFETIME) -> Tuple[ChatInviteLink, datetime]:
+        """Create a limited-use invite link expiring after `lifetime` (the configured time by default)"""
+        expire_date = datetime.now() + lifetime
+        invite_link = await self.bot.create_chat_invite_link(
+            chat_id=group_id,
+            member_limit=config.PORTAL_MAX_USES,
+            expire_date=expire_date,
+            name=name
+        )
+        return invite_link, expire_date
+    
+    async def _take_invite_link(self, group_id: int, user_id: int) -> Tuple[ChatInviteLink, datetime]:
+        """Pop a fresh pooled invite link for the group, or create one directly"""
+        pool = self._invite_pools.setdefault(group_id, deque())
+        now = time.monotonic()
+        taken = None
+        while pool:
+            minted_at, invite_link, expire_date = pool.popleft()
+            if now - minted_at < INVITE_POOL_MAX_AGE:
+                taken = (invite_link, expire_date)
+                break
+            self._spawn(self._revoke_invite_link(group_id, invite_link))
         
-        # Create verification record
-        await self.db.create_verification(portal_id, user_id, username)
+        # Only mint ahead while clicks come in fast enough to use the links;
+        # one replacement per click keeps the pool sized to the click rate
+        last_take = self._last_invite_take.get(group_id)
+        self._last_invite_take[group_id] = now
+        if last_take is not None and now - last_take < INVITE_POOL_MAX_AGE:
+            refills = self._invite_refills.setdefault(group_id, set())
+            if len(pool) + len(refills) < INVITE_POOL_SIZE:
+                task = asyncio.create_task(self._refill_invite_pool(group_id))
+                refills.add(task)
+                task.add_done_callback(refills.discard)
         
-        # Generate invite link
+        return taken or await self._create_invite_link(group_id, "Portal-" + str(user_id))
+    
+    async def _revoke_invite_link(self, group_id: int, invite_link: ChatInviteLink):
+        """Revoke a pooled link that was never handed out"""
         try:
-            expire_date = datetime.now() + timedelta(minutes=config.PORTAL_INVITE_EXPIRY_MINUTES)
-            
-            invite_link = await self.bot.create_chat_invite_link(
-                chat_id=portal["private_group_id"],
-                member_limit=config.PORTAL_MAX_USES,
-                expire_date=expire_date,
-                name=f"Portal-{user_id}"
-            )
-            
-            # Update verification status
-            await self.db.update_verification(
-                portal_id=portal_id,
-                user_id=user_id,
-                status="verified",
-                invite_link=invite_link.invite_link,
-                invite_expires_at=expire_date.isoformat()
-            )
-            
-            logger.info(f"User {user_id} verified for portal {portal_id}")
-            
-            return {
-                "success": True,
-                "invite_link": invite_link.invite_link,
-                "message": "Verification successful!",
-                "expires_at": expire_date,
-                "group_title": portal["private_group_title"]
-            }
-            
+            await self.bot.revoke_chat_invite_link(group_id, invite_link.invite_link)
         except TelegramError as e:
-            logger.error(f"Error creating invite link: {e}")
-            return {"success": False, "message": f"Error creating invite link: {str(e)}"}
+            logger.error("Error revoking invite link: %s", e)
     
-    async def _check_requirements(self, portal: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    async def _refill_invite_pool(self, group_id: int):
+        """Add one freshly minted link to a group's invite pool"""
+        pool = self._invite_pools[group_id]
+        try:
+            invite_link, expire_date = await self._create_invite_link(group_id, "Portal", _POOLED_INVITE_LIFETIME)
+            pool.append((time.monotonic(), invite_link, expire_date))
+        except TelegramError as e:
+            logger.error("Error refilling invite pool: %s", e)
+    
+    async def _check_requirements(self, portal: Portal, user_id: int) -> Dict[str, Any]:
         """Check if user meets portal requirements"""
+        require_username = portal.require_username
+        require_photo = portal.require_profile_photo
+        if not require_username and not require_photo:
+            # Most portals have no requirements: skip the gather and its tasks
+            return {"passed": True, "message": "All requirements met"}
         try:
-            # Get user info from Telegram
-            user = await self.bot.get_chat(user_id)
+            # Only ask Telegram for what the portal requires, both calls at once
+            has_username, has_photo = await asyncio.gather(
+                self._check_username(user_id) if require_username else _none(),
+                self._check_photo(user_id) if require_photo else _none()
+            )
             
             # Check username requirement
-            if portal.get("require_username") and not user.username:
+            if require_username and not has_username:
                 return {"passed": False, "message": "❌ You need to set a Telegram username to join"}
             
             # Check profile photo requirement
-            if portal.get("require_profile_photo"):
-                photos = await self.bot.get_user_profile_photos(user_id, limit=1)
-                if photos.total_count == 0:
-                    return {"passed": False, "message": "❌ You need to set a profile photo to join"}
+            if require_photo and not has_photo:
+                return {"passed": False, "message": "❌ You need to set a profile photo to join"}
             
             # Account age check would require additional API or data
             # For now, we skip this as Telegram doesn't expose account creation date
@@ -168,15 +398,33 @@ Click the button below to start verification.
             return {"passed": True, "message": "All requirements met"}
             
         except TelegramError as e:
-            logger.error(f"Error checking requirements: {e}")
+            logger.error("Error checking requirements: %s", e)
             return {"passed": False, "message": f"Error checking requirements: {str(e)}"}
     
+    async def _check_username(self, user_id: int) -> bool:
+        """Whether the user has a Telegram username"""
+        if user_id in self._has_username:
+            return True
+        user = await self.bot.get_chat(user_id)
+        if user.username:
+            self._has_username[user_id] = True
+        return bool(user.username)
+    
+    async def _check_photo(self, user_id: int) -> bool:
+        """Whether the user has at least one profile photo"""
+        if user_id in self._has_photo:
+            return True
+        photos = await self.bot.get_user_profile_photos(user_id, limit=1)
+        if photos.total_count:
+            self._has_photo[user_id] = True
+        return photos.total_count > 0
+    
     async def get_portal_message(self, portal_id: str) -> Optional[str]:
         """Get the formatted portal message"""
-        portal = await self.db.get_portal(portal_id)
+        portal = await self._get_portal_cached(portal_id)
         if not portal:
             return None
-        return portal.get("welcome_message")
+        return portal.welcome_message
     
     async def setup_portal_post(
         self,
@@ -189,33 +437,30 @@ Click the button below to start verification.
         Returns:
             Dict with 'text' and 'button_text', 'callback_data'
         """
-        portal = await self.db.get_portal(portal_id)
+        portal = await self._get_portal_cached(portal_id)
         if not portal:
             return {"success": False, "message": "Portal not found"}
         
-        message = custom_message or portal.get("welcome_message") or f"""
-🚀 *Join {portal['private_group_title']}*
-
-🔐 This is a protected group. Click the button below to verify and get access.
-
-✅ Verification is quick and easy
-⏱️ Invite link expires in {config.PORTAL_INVITE_EXPIRY_MINUTES} minutes
-🔒 One-time use link for security
-        """
+        message = custom_message or portal.welcome_message or PORTAL_POST_TEMPLATE.format(
+            group_title=_group_label(portal.private_group_title),
+            expiry_minutes=config.PORTAL_INVITE_EXPIRY_MINUTES
+        )
         
         return {
             "success": True,
             "text": message,
             "button_text": "🔓 Verify & Join",
-            "callback_data": f"portal_verify:{portal_id}",
+            "callback_data": "portal_verify:" + portal_id,
             "portal": portal
         }
     
     async def handle_new_member(self, portal_id: str, user_id: int) -> bool:
         """Handle when a new member joins through portal"""
+        if not is_valid_portal_id(portal_id):
+            return False
         verification = await self.db.get_verification(portal_id, user_id)
         
-        if verification and verification.get("status") == "verified":
+        if verification and verification.status == "verified":
             # User was verified, allow them
             await self.db.update_verification(portal_id, user_id, "joined")
             return True
@@ -227,16 +472,24 @@ Click the button below to start verification.
         """Kick an unverified user from the group"""
         try:
             await self.bot.ban_chat_member(group_id, user_id)
-            await asyncio.sleep(1)
-            await self.bot.unban_chat_member(group_id, user_id)  # Unban so they can try again
-            return True
         except TelegramError as e:
-            logger.error(f"Error kicking user: {e}")
+            logger.error("Error kicking user: %s", e)
             return False
+        # Unban shortly after so they can try again, without holding up the caller
+        self._spawn(self._delayed_unban(group_id, user_id))
+        return True
+    
+    async def _delayed_unban(self, group_id: int, user_id: int, delay: float = KICK_UNBAN_DELAY):
+        """Lift a kick's ban after `delay` seconds"""
+        await asyncio.sleep(delay)
+        try:
+            await self.bot.unban_chat_member(group_id, user_id)
+        except TelegramError as e:
+            logger.error("Error unbanning kicked user: %s", e)
     
     async def get_portal_stats(self, portal_id: str) -> Optional[Dict[str, Any]]:
         """Get portal statistics"""
-        portal = await self.db.get_portal(portal_id)
+        portal = await self._get_portal_cached(portal_id)
         if not portal:
             return None
         
@@ -244,13 +497,13 @@ Click the button below to start verification.
         
         return {
             "portal_id": portal_id,
-            "public_channel": portal.get("public_channel_username"),
-            "private_group": portal.get("private_group_title"),
-            "is_active": portal.get("is_active"),
-            "verified_users": stats.get("verified", 0),
-            "pending_users": stats.get("pending", 0),
-            "banned_users": stats.get("banned", 0),
-            "created_at": portal.get("created_at")
+            "public_channel": portal.public_channel_username,
+            "private_group": portal.private_group_title,
+            "is_active": portal.is_active,
+            "verified_users": stats["verified"],
+            "pending_users": stats["pending"],
+            "banned_users": stats["banned"],
+            "created_at": portal.created_at
         }
     
     async def list_user_portals(self, owner_id: int) -> List[Dict[str, Any]]:
@@ -259,56 +512,60 @@ Click the button below to start verification.
         result = []
         
         for portal in portals:
-            stats = await self.db.get_portal_stats(portal["portal_id"])
             result.append({
-                "portal_id": portal["portal_id"],
-                "public_channel": portal.get("public_channel_username"),
-                "private_group": portal.get("private_group_title"),
-                "is_active": portal.get("is_active"),
-                "verified_count": stats.get("verified", 0)
+                "portal_id": portal.portal_id,
+                "public_channel": portal.public_channel_username,
+                "private_group": portal.private_group_title,
+                "is_active": portal.is_active,
+                "verified_count": portal.verified_count
             })
         
         return result
 
 
-def format_portal_setup_message(portal_id: str, public_channel: str, private_group: str) -> str:
-    """Format the portal setup success message"""
-    return f"""
-✅ *Portal Created Successfully!*
+def is_valid_portal_id(portal_id: str) -> bool:
+    """Whether portal_id is shaped like one from generate_portal_id"""
+    return _PORTAL_ID_RE.fullmatch(portal_id) is not None
 
-🆔 *Portal ID:* `{portal_id}`
-📢 *Public Channel:* @{public_channel}
-🔒 *Private Group:* {private_group}
 
-*Next Steps:*
+def _group_label(title: Optional[str]) -> str:
+    """HTML-safe group title, with a fallback for groups stored without one"""
+    return html.escape(title or "Private Group")
 
-1️⃣ Post the verification message in your public channel:
-   Use `/portal post {portal_id}` to get the message
 
-2️⃣ Make sure the bot is admin in both:
-   • Public channel (to post messages)
-   • Private group (to create invite links)
+async def _none():
+    """Placeholder awaitable for a gather() slot that has nothing to fetch"""
+    return None
 
-3️⃣ Users click "Verify & Join" → Get one-time invite link
 
-*Management Commands:*
-• `/portal stats {portal_id}` - View statistics
-• `/portal settings {portal_id}` - Change settings
-• `/portal delete {portal_id}` - Delete portal
-    """
+def format_portal_setup_message(portal_id: str, public_channel: str, private_group: str) -> str:
+    """Format the portal setup success message"""
+    # Not cached: every call has a new portal_id, so a cache would never hit
+    return PORTAL_SETUP_TEMPLATE.format(
+        portal_id=portal_id,
+        public_channel=public_channel,
+        private_group=_group_label(private_group)
+    )
 
 
 def format_verification_success(group_title: str, invite_link: str, expires_minutes: int) -> str:
     """Format the verification success message"""
+    head, tail = _verification_success_parts(group_title, expires_minutes)
+    return head + invite_link + tail
+
+
+@lru_cache(maxsize=1024)
+def _verification_success_parts(group_title: str, expires_minutes: int):
+    """Text around the invite link; the link is unique per user, the rest per portal"""
     return f"""
-✅ *Verification Successful!*
+✅ <b>Verification Successful!</b>
 
-You can now join *{group_title}*
+You can now join <b>{_group_label(group_title)}</b>
 
-🔗 *Your Invite Link:*
-{invite_link}
+🔗 <b>Your Invite Link:</b>
+""", f"""
 
-⚠️ *Important:*
+⚠️ <b>Important:</b>
 • Link expires in {expires_minutes} minutes
 • Link can only be used once
 • Click the link above to join
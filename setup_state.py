@@ -0,0 +1,116 @@
+"""
+Setup State Store
+Portal setup wizard state per user, kept in Redis when REDIS_URL is set
+so it survives restarts and is shared by every bot worker
+"""
+import logging
+import time
+from typing import Optional, Dict, Any
+
+from telegram import Message
+from telegram.ext import filters
+
+import json_utils
+from cache import TTLCache
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Optional dependency; state stays in memory without it
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class SetupStateStore:
+    """Per-user wizard state that expires `ttl` seconds after the last step"""
+
+    def __init__(self, redis_url: str = "", ttl: int = 600):
+        self.ttl = ttl
+        self._redis = None
+        # The state itself when in memory, otherwise an index of users seen in the wizard
+        self._local = TTLCache(maxsize=10_000, ttl=ttl)
+        # Users already looked up in Redis by recover()
+        self._probed = TTLCache(maxsize=10_000, ttl=ttl)
+        self._started = time.monotonic()
+
+        if redis_url:
+            if aioredis is None:
+                logger.warning("REDIS_URL is set but redis is not installed - keeping setup state in memory")
+            else:
+                self._redis = aioredis.from_url(redis_url)
+
+    async def recover(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """State of a Redis-backed wizard started before this process, if any
+        
+        Only such wizards are missing from the local index, and only until they
+        expire one ttl after startup, so each user is looked up at most once.
+        """
+        if not self._redis or time.monotonic() - self._started > self.ttl or user_id in self._probed:
+            return None
+        self._probed[user_id] = True
+        return await self.get(user_id)
+
+    def __contains__(self, user_id: int) -> bool:
+        """Sync check against this process's view, for use in handler filters"""
+        return user_id in self._local
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}:portalwizard"
+
+    async def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's wizard state, or None if they aren't in the wizard"""
+        if not self._redis:
+            return self._local.get(user_id)
+        try:
+            raw = await self._redis.get(self._key(user_id))
+            if not raw:
+                self._local.pop(user_id)
+                return None
+            self._local[user_id] = True
+            return json_utils.loads(raw)
+        except Exception as e:
+            logger.error(f"Error reading setup state: {e}")
+            return None
+
+    async def put(self, user_id: int, state: Dict[str, Any]) -> bool:
+        """Store a user's wizard state, restarting its expiry"""
+        if not self._redis:
+            self._local[user_id] = state
+            return True
+        try:
+            await self._redis.setex(self._key(user_id), self.ttl, json_utils.dumps(state))
+            self._local[user_id] = True
+            return True
+        except Exception as e:
+            logger.error(f"Error saving setup state: {e}")
+            return False
+
+    async def delete(self, user_id: int) -> bool:
+        """Drop a user's wizard state"""
+        if not self._redis:
+            self._local.pop(user_id)
+            return True
+        self._local.pop(user_id)
+        try:
+            await self._redis.delete(self._key(user_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting setup state: {e}")
+            return False
+
+    async def close(self):
+        """Close the Redis connection, if any"""
+        if self._redis:
+            await self._redis.aclose()
+
+
+class SetupStateFilter(filters.MessageFilter):
+    """Matches messages from users with an active portal setup wizard"""
+
+    def __init__(self, store: SetupStateStore):
+        super().__init__(name="SetupStateFilter")
+        self._store = store
+
+    def filter(self, message: Message) -> bool:
+        return message.from_user is not None and message.from_user.id in self._store
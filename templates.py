@@ -0,0 +1,139 @@
+"""
+Message Templates
+Static HTML reply text for the bot, built once at import
+"""
+
+WELCOME_TEMPLATE = """
+🚀 <b>Welcome to MegaETH Token Bot!</b> 🚀
+
+Hello {first_name}! I can help you with:
+
+📊 <b>Token Alerts</b>
+• New token launches on MegaETH
+• Price pumps and dumps
+• Volume spikes
+
+💬 <b>AI Chat</b>
+• Chat with AI via Mogra
+• Ask questions about crypto
+
+🔍 <b>Token Info</b>
+• Search for any token
+• View price, volume, liquidity
+• Track trending pairs
+
+<b>Quick Commands:</b>
+/alerts - Manage alert subscriptions
+/trending - View trending tokens
+/new - View newly launched tokens
+/gainers - Top gaining tokens
+/losers - Top losing tokens
+/search &lt;query&gt; - Search for a token
+/price &lt;token&gt; - Get token price
+/chat - Start AI chat
+/help - Show all commands
+
+Get started by typing /alerts to subscribe!
+"""
+
+HELP_TEXT = """
+📖 <b>MegaETH Bot Commands</b>
+
+<b>Alert Commands:</b>
+/alerts - Manage your alert subscriptions
+/subscribe - Subscribe to token alerts
+/unsubscribe - Unsubscribe from alerts
+
+<b>Token Info Commands:</b>
+/trending - Top tokens by volume
+/new - Newly launched tokens (24h)
+/gainers - Top gaining tokens
+/losers - Top losing tokens
+/search &lt;query&gt; - Search for a token
+/price &lt;symbol&gt; - Get token price
+
+<b>AI Chat Commands:</b>
+/chat - Start AI conversation
+/setchat &lt;chat_id&gt; - Set Mogra chat ID
+
+<b>🔐 Portal Commands:</b>
+/portal setup - Create new verification portal
+/portal list - List your portals
+/portal post &lt;id&gt; - Get portal message to post
+/portal stats &lt;id&gt; - View portal statistics
+/portal settings &lt;id&gt; - Configure portal
+/portal delete &lt;id&gt; - Delete a portal
+
+<b>Other Commands:</b>
+/help - Show this help message
+
+<i>Tip: tap the menu button next to the message box to browse all commands.</i>
+"""
+
+PORTAL_HELP = (
+    "🔐 <b>Portal Commands</b>\n\n"
+    "Portals allow you to verify users before they join your private group.\n\n"
+    "<b>Commands:</b>\n"
+    "• <code>/portal setup</code> - Create new portal\n"
+    "• <code>/portal list</code> - List your portals\n"
+    "• <code>/portal post &lt;id&gt;</code> - Get verification message\n"
+    "• <code>/portal stats &lt;id&gt;</code> - View statistics\n"
+    "• <code>/portal settings &lt;id&gt;</code> - Configure portal\n"
+    "• <code>/portal delete &lt;id&gt;</code> - Delete portal\n\n"
+    "<b>How it works:</b>\n"
+    "1. Create a portal linking public channel → private group\n"
+    "2. Post verification message in public channel\n"
+    "3. Users click verify → get one-time invite link"
+)
+
+# Portal texts; group titles are HTML-escaped by the caller
+PORTAL_WELCOME_TEMPLATE = """
+🔐 <b>Portal Verification</b>
+
+Welcome! To join <b>{group_title}</b>, you need to verify yourself.
+
+Click the button below to start verification.
+"""
+
+PORTAL_POST_TEMPLATE = """
+🚀 <b>Join {group_title}</b>
+
+🔐 This is a protected group. Click the button below to verify and get access.
+
+✅ Verification is quick and easy
+⏱️ Invite link expires in {expiry_minutes} minutes
+🔒 One-time use link for security
+"""
+
+PORTAL_SETUP_TEMPLATE = """
+✅ <b>Portal Created Successfully!</b>
+
+🆔 <b>Portal ID:</b> <code>{portal_id}</code>
+📢 <b>Public Channel:</b> @{public_channel}
+🔒 <b>Private Group:</b> {private_group}
+
+<b>Next Steps:</b>
+
+1️⃣ Post the verification message in your public channel:
+   Use <code>/portal post {portal_id}</code> to get the message
+
+2️⃣ Make sure the bot is admin in both:
+   • Public channel (to post messages)
+   • Private group (to create invite links)
+
+3️⃣ Users click "Verify & Join" → Get one-time invite link
+
+<b>Management Commands:</b>
+• <code>/portal stats {portal_id}</code> - View statistics
+• <code>/portal settings {portal_id}</code> - Change settings
+• <code>/portal delete {portal_id}</code> - Delete portal
+"""
+
+# List reply headers
+TRENDING_HEADER = "📈 <b>Trending MegaETH Tokens</b>\n\n"
+NEW_TOKENS_HEADER = "🆕 <b>New MegaETH Tokens (24h)</b>\n\n"
+GAINERS_HEADER = "🚀 <b>Top MegaETH Gainers (24h)</b>\n\n"
+LOSERS_HEADER = "📉 <b>Top MegaETH Losers (24h)</b>\n\n"
+PORTALS_HEADER = "🔐 <b>Your Portals</b>\n\n"
+TOP_TRENDING_HEADER = "📈 <b>Top 5 Trending Tokens</b>\n\n"
+NEW_PAIRS_HEADER = "🆕 <b>New Tokens (24h)</b>\n\n"